@@ -0,0 +1,160 @@
+"""Declarative index registry, applied at startup"""
+import asyncio
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from app.database.mongo import get_database
+
+# Every collection the routes query, with the indexes those queries need.
+# Unique indexes back the places where the code assumes one document per key.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+    ],
+    "documents": [
+        IndexModel([("user_id", ASCENDING), ("document_type", ASCENDING)], name="user_document_type_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_status"),
+        # Admin review queue, oldest first, with and without a document_type filter
+        IndexModel(
+            [("status", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)],
+            name="status_updated_at_id"
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("document_type", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)],
+            name="status_type_updated_at_id"
+        ),
+    ],
+    "fees": [
+        IndexModel([("user_id", ASCENDING)], name="user_unique", unique=True),
+    ],
+    "fee_transactions": [
+        # Keyset pages of a student's payments, newest first
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_created_at_id"
+        ),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Finance reports and exports over a date range, across all students
+        IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)], name="created_at_id"),
+    ],
+    "payment_requests": [
+        # One payment per (student, Idempotency-Key); keys are remembered for a day
+        IndexModel([("user_id", ASCENDING), ("key", ASCENDING)], name="user_key_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=24 * 3600),
+    ],
+    "student_courses": [
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING)], name="user_course_unique", unique=True),
+    ],
+    "course_waitlist": [
+        IndexModel([("course_id", ASCENDING), ("user_id", ASCENDING)], name="course_user_unique", unique=True),
+        # Head of each course's queue, and positions within it
+        IndexModel([("course_id", ASCENDING), ("joined_at", ASCENDING), ("_id", ASCENDING)], name="course_joined_at_id"),
+        IndexModel([("user_id", ASCENDING), ("joined_at", ASCENDING)], name="user_joined_at"),
+    ],
+    "hostel_applications": [
+        IndexModel([("user_id", ASCENDING)], name="user_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("applied_at", ASCENDING)], name="status_applied_at"),
+    ],
+    "hostel_rooms": [
+        IndexModel([("hostel", ASCENDING), ("room_number", ASCENDING)], name="hostel_room_unique", unique=True),
+        # First room with a free bed in a hostel: equality on hostel, ordered by room, range on free_beds
+        IndexModel(
+            [("hostel", ASCENDING), ("room_number", ASCENDING), ("free_beds", ASCENDING)],
+            name="hostel_room_free_beds"
+        ),
+        IndexModel([("occupants", ASCENDING)], name="occupants"),
+    ],
+    "hostel_attendance": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING)], name="user_date_unique", unique=True),
+    ],
+    "notifications": [
+        # Keyset pages of all / unread notifications, newest first
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_created_at_id"
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_read_created_at_id"
+        ),
+        # Notifications delivered from the outbox carry its event id, so a redelivery is rejected
+        IndexModel(
+            [("event_id", ASCENDING)],
+            name="event_id_unique",
+            unique=True,
+            partialFilterExpression={"event_id": {"$exists": True}}
+        ),
+    ],
+    "outbox": [
+        # The worker scans pending events oldest first; delivered ones are dropped after a week
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="status_created_at_id"),
+        # Users with an event waiting to retry
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)], name="status_available_at"),
+        IndexModel([("processed_at", ASCENDING)], name="processed_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "conversations": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+    ],
+}
+
+# Outcome of the last ensure_indexes run, per "collection.index"
+index_build_status: Dict[str, str] = {}
+_index_task: Optional[asyncio.Task] = None
+
+async def ensure_indexes() -> Dict[str, str]:
+    """Create every registered index, one at a time so a failure only affects that index"""
+    db = await get_database()
+    for collection, models in INDEXES.items():
+        for model in models:
+            key = f"{collection}.{model.document['name']}"
+            index_build_status[key] = "building"
+            try:
+                await db[collection].create_indexes([model])
+                index_build_status[key] = "ready"
+            except PyMongoError as e:
+                # Usually duplicate data blocking a unique index; the app still runs without it
+                index_build_status[key] = f"failed: {e}"
+                print(f"WARNING: could not build index {key}: {e}")
+    return index_build_status
+
+def start_index_build() -> asyncio.Task:
+    """Build indexes in the background so startup doesn't wait on them"""
+    global _index_task
+    if _index_task is None or _index_task.done():
+        _index_task = asyncio.create_task(ensure_indexes())
+    return _index_task
+
+async def index_report() -> List[Dict]:
+    """Each index on the registered collections with its size and $indexStats usage"""
+    db = await get_database()
+    report = []
+    for collection in INDEXES:
+        declared = {model.document["name"] for model in INDEXES[collection]}
+        sizes = {}
+        async for stats in db[collection].aggregate([{"$collStats": {"storageStats": {}}}]):
+            sizes.update(stats.get("storageStats", {}).get("indexSizes", {}))
+
+        async for stats in db[collection].aggregate([{"$indexStats": {}}]):
+            name = stats["name"]
+            report.append({
+                "collection": collection,
+                "name": name,
+                "key": stats.get("key"),
+                "unique": bool(stats.get("spec", {}).get("unique", False)),
+                "declared": name in declared,
+                "status": index_build_status.get(f"{collection}.{name}"),
+                "size_bytes": sizes.get(name),
+                "accesses": stats.get("accesses", {}).get("ops", 0),
+                "accesses_since": stats.get("accesses", {}).get("since"),
+            })
+
+        existing = {row["name"] for row in report if row["collection"] == collection}
+        for name in sorted(declared - existing):
+            report.append({
+                "collection": collection,
+                "name": name,
+                "declared": True,
+                "status": index_build_status.get(f"{collection}.{name}", "missing"),
+            })
+    return report
@@ -1,6 +1,7 @@
 """Auto-seed courses and hostels if collections are empty"""
 from datetime import datetime
 from app.database.mongo import get_database
+from app.services.hostel_rooms import seed_rooms
 
 COURSES = [
     {"course_code": "CS101", "course_name": "Introduction to Computer Science", "credits": 3, "description": "Fundamentals of programming"},
@@ -11,10 +12,10 @@ COURSES = [
 ]
 
 HOSTELS = [
-    {"name": "North Hostel", "capacity": 200, "available_rooms": 150},
-    {"name": "South Hostel", "capacity": 180, "available_rooms": 120},
-    {"name": "East Hostel", "capacity": 150, "available_rooms": 100},
-    {"name": "West Hostel", "capacity": 160, "available_rooms": 110},
+    {"name": "North Hostel", "capacity": 200, "beds_per_room": 2},
+    {"name": "South Hostel", "capacity": 180, "beds_per_room": 2},
+    {"name": "East Hostel", "capacity": 150, "beds_per_room": 2},
+    {"name": "West Hostel", "capacity": 160, "beds_per_room": 2},
 ]
 
 async def seed_if_empty():
@@ -33,3 +34,8 @@ async def seed_if_empty():
             h["created_at"] = datetime.utcnow()
         await db.hostels.insert_many(HOSTELS)
         print("Seeded hostels")
+
+    # Also covers databases from before room-level inventory existed
+    created = await seed_rooms()
+    if created:
+        print(f"Seeded rooms for {len(created)} hostel(s)")
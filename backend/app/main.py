@@ -1,17 +1,28 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from app.database.mongo import init_db
+from app.database.mongo import init_db, close_db
 from app.database.seed import seed_if_empty
+from app.database.indexes import start_index_build
+from app.utils.auth import shutdown_password_executor
+from app.utils.uploads import UploadSizeLimitMiddleware
+from app.utils.background import start_background, start_periodic, stop_background_tasks
+from app.services.notification_service import reconcile_unread_counters
+from app.services.outbox import run_outbox_worker
+from app.services.blob_store import collect_garbage
+from app.services.course_catalog import load_course_catalog
+import os
 
 # Ensure uploads directory exists
 UPLOADS_DIR = Path(__file__).parent.parent / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
-from app.routes import auth, dashboard, documents, fees, courses, hostel, notifications, ai_assistant, profile, admin
+from app.routes import auth, dashboard, documents, fees, courses, hostel, notifications, ai_assistant, profile, admin, finance
 
 app = FastAPI(title="CampusFlow AI", version="1.0.0")
 
+# Registered before CORS so CORS wraps it and 413s still carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS middleware — exact origins required when allow_credentials=True (no "*")
 origins = [
     "http://localhost:5173",  # local dev (Vite)
@@ -33,7 +44,26 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    start_index_build()
     await seed_if_empty()
+    await load_course_catalog()
+    start_periodic(
+        "reconcile-unread-counters",
+        float(os.getenv("UNREAD_RECONCILE_INTERVAL_SECONDS", "3600")),
+        reconcile_unread_counters
+    )
+    start_background("outbox-worker", run_outbox_worker())
+    start_periodic(
+        "collect-upload-blobs",
+        float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "86400")),
+        collect_garbage
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_background_tasks()
+    shutdown_password_executor()
+    await close_db()
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -46,9 +76,7 @@ app.include_router(notifications.router, prefix="/api/notifications", tags=["Not
 app.include_router(ai_assistant.router, prefix="/api/ai", tags=["AI Assistant"])
 app.include_router(profile.router, prefix="/api/profile", tags=["Profile"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
-
-# Serve uploaded files
-app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+app.include_router(finance.router, prefix="/api/admin/finance", tags=["Finance"])
 
 @app.get("/")
 async def root():
@@ -1,15 +1,15 @@
 from .user import User, UserCreate, UserLogin, UserResponse
-from .document import Document, DocumentCreate, DocumentUpdate
+from .document import Document, DocumentCreate, DocumentUpdate, DocumentVerifyBulk
 from .fee import Fee, FeeCreate, FeePayment, Transaction
-from .course import Course, CourseRegistration, CourseCreate
+from .course import Course, CourseRegistration, CourseCreate, CourseCapacityUpdate
 from .hostel import HostelApplication, HostelPreference, HostelCreate
-from .notification import Notification, NotificationCreate
+from .notification import Notification, NotificationCreate, BroadcastCreate, BroadcastFilter
 
 __all__ = [
     "User", "UserCreate", "UserLogin", "UserResponse",
-    "Document", "DocumentCreate", "DocumentUpdate",
+    "Document", "DocumentCreate", "DocumentUpdate", "DocumentVerifyBulk",
     "Fee", "FeeCreate", "FeePayment", "Transaction",
-    "Course", "CourseRegistration", "CourseCreate",
+    "Course", "CourseRegistration", "CourseCreate", "CourseCapacityUpdate",
     "HostelApplication", "HostelPreference", "HostelCreate",
-    "Notification", "NotificationCreate"
+    "Notification", "NotificationCreate", "BroadcastCreate", "BroadcastFilter"
 ]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -7,9 +7,14 @@ class CourseCreate(BaseModel):
     course_name: str
     credits: int
     description: Optional[str] = None
+    # None means unlimited seats
+    capacity: Optional[int] = Field(None, ge=1)
+
+class CourseCapacityUpdate(BaseModel):
+    capacity: Optional[int] = Field(None, ge=1)
 
 class CourseRegistration(BaseModel):
-    course_ids: List[str]
+    course_ids: List[str] = Field(..., min_length=1, max_length=50)
 
 class Course(BaseModel):
     id: str
@@ -17,6 +22,7 @@ class Course(BaseModel):
     course_name: str
     credits: int
     description: Optional[str]
+    capacity: Optional[int] = None
     created_at: datetime
 
 class StudentCourse(BaseModel):
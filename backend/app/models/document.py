@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -23,6 +23,9 @@ class DocumentUpdate(BaseModel):
     status: Optional[DocumentStatus] = None
     file_url: Optional[str] = None
 
+class DocumentVerifyBulk(BaseModel):
+    document_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
 class Document(BaseModel):
     id: str
     user_id: str
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional
 from datetime import datetime
 
 class Transaction(BaseModel):
@@ -11,7 +11,7 @@ class Transaction(BaseModel):
     created_at: datetime
 
 class FeePayment(BaseModel):
-    amount: float
+    amount: float = Field(..., gt=0)
     payment_method: str = "online"
 
 class FeeCreate(BaseModel):
@@ -25,6 +25,5 @@ class Fee(BaseModel):
     paid_amount: float
     remaining_amount: float
     description: Optional[str]
-    transactions: List[Transaction]
     created_at: datetime
     updated_at: datetime
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -19,8 +19,9 @@ class HostelPreference(BaseModel):
 
 class HostelCreate(BaseModel):
     name: str
-    capacity: int
-    available_rooms: int
+    # Total beds; rooms are created to hold them
+    capacity: int = Field(..., ge=1)
+    beds_per_room: int = Field(2, ge=1)
 
 class HostelApplication(BaseModel):
     id: str
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -25,3 +25,17 @@ class Notification(BaseModel):
     link: Optional[str]
     is_read: bool
     created_at: datetime
+
+class BroadcastFilter(BaseModel):
+    """Which students a broadcast targets; empty means every student"""
+    student_ids: Optional[List[str]] = None
+    risk_levels: Optional[List[str]] = None
+    hostel_status: Optional[str] = None
+    max_completion: Optional[float] = None
+
+class BroadcastCreate(BaseModel):
+    title: str
+    message: str
+    notification_type: NotificationType = NotificationType.INFO
+    link: Optional[str] = None
+    filter: BroadcastFilter = BroadcastFilter()
@@ -1,77 +1,37 @@
-from fastapi import APIRouter, Depends
-from app.utils.auth import get_current_admin
-from app.utils.onboarding import calculate_completion, detect_risk
+from typing import Optional
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from app.utils.auth import get_current_admin, user_cache, login_admission
+from app.utils.onboarding import (
+    calculate_completion_many, detect_risk_many, health_score_from_completion, summarize_students
+)
 from app.database.mongo import get_database
+from app.database.indexes import index_report
+from app.services.notification_hub import notification_hub
+from app.services.outbox import outbox_stats
+from app.services.course_seats import capacity_report
+from app.services.blob_store import served_file_url
+from app.services.broadcast_service import create_broadcast_job, run_broadcast_job, get_broadcast_job
+from app.models.notification import BroadcastCreate
+from app.models.document import DocumentStatus, DocumentType
+from app.utils.mongo import mongo_to_dict
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, keyset_filter
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
+# Students scored per batch; each batch costs a fixed number of queries
+STUDENT_BATCH_SIZE = 500
+
 @router.get("/dashboard")
 async def get_admin_dashboard(current_admin: dict = Depends(get_current_admin)):
-    db = await get_database()
-    
-    # Total students
-    total_students = await db.users.count_documents({"role": "student"})
-    
-    # Calculate completion rates
-    cursor = db.users.find({"role": "student"})
-    completions = []
-    risk_students = []
-    
-    async for user in cursor:
-        user_id = str(user["_id"])
-        completion = await calculate_completion(user_id)
-        risk = await detect_risk(user_id)
-        
-        completions.append(completion["total_completion"])
-        
-        if risk["level"] in ["HIGH", "MEDIUM"]:
-            risk_students.append({
-                "id": user_id,
-                "name": user.get("full_name"),
-                "email": user.get("email"),
-                "completion": completion["total_completion"],
-                "risk": risk
-            })
-    
-    avg_completion = sum(completions) / len(completions) if completions else 0
-    
-    # Section-wise metrics
-    section_metrics = {
-        "documents": {"complete": 0, "pending": 0},
-        "fees": {"complete": 0, "pending": 0},
-        "courses": {"complete": 0, "pending": 0},
-        "hostel": {"complete": 0, "pending": 0}
-    }
-    
-    async for user in db.users.find({"role": "student"}):
-        user_id = str(user["_id"])
-        completion = await calculate_completion(user_id)
-        
-        if completion["documents"] >= 25:
-            section_metrics["documents"]["complete"] += 1
-        else:
-            section_metrics["documents"]["pending"] += 1
-        
-        if completion["fees"] >= 25:
-            section_metrics["fees"]["complete"] += 1
-        else:
-            section_metrics["fees"]["pending"] += 1
-        
-        if completion["courses"] >= 25:
-            section_metrics["courses"]["complete"] += 1
-        else:
-            section_metrics["courses"]["pending"] += 1
-        
-        if completion["hostel"] >= 25:
-            section_metrics["hostel"]["complete"] += 1
-        else:
-            section_metrics["hostel"]["pending"] += 1
+    summary = await summarize_students()
+    section_metrics = summary["section_metrics"]
     
     return {
-        "total_students": total_students,
-        "average_completion": round(avg_completion, 2),
-        "risk_students": risk_students[:10],  # Top 10
+        "total_students": summary["total_students"],
+        "average_completion": summary["average_completion"],
+        "risk_students": summary["risk_students"],  # Top 10
         "section_metrics": section_metrics,
         "chart_data": {
             "labels": ["Documents", "Fees", "Courses", "Hostel"],
@@ -94,27 +54,127 @@ async def get_admin_dashboard(current_admin: dict = Depends(get_current_admin)):
 async def get_all_students(current_admin: dict = Depends(get_current_admin)):
     db = await get_database()
     
-    cursor = db.users.find({"role": "student"})
+    cursor = db.users.find(
+        {"role": "student"},
+        {"full_name": 1, "email": 1, "student_id": 1}
+    ).batch_size(STUDENT_BATCH_SIZE)
     students = []
+    batch = []
     
     async for user in cursor:
-        user_id = str(user["_id"])
-        completion = await calculate_completion(user_id)
-        risk = await detect_risk(user_id)
-        
-        students.append({
+        batch.append(user)
+        if len(batch) >= STUDENT_BATCH_SIZE:
+            students.extend(await _student_rows(batch))
+            batch = []
+    if batch:
+        students.extend(await _student_rows(batch))
+    
+    return {"students": students}
+
+async def _student_rows(users: list) -> list:
+    user_ids = [str(user["_id"]) for user in users]
+    completions = await calculate_completion_many(user_ids)
+    risks = await detect_risk_many(user_ids)
+    
+    return [
+        {
             "id": user_id,
             "name": user.get("full_name"),
             "email": user.get("email"),
             "student_id": user.get("student_id"),
-            "completion": completion["total_completion"],
-            "health_score": 100 - (4 - sum([
-                1 if completion["documents"] >= 25 else 0,
-                1 if completion["fees"] >= 25 else 0,
-                1 if completion["courses"] >= 25 else 0,
-                1 if completion["hostel"] >= 25 else 0
-            ])) * 25,
-            "risk": risk
-        })
+            "completion": completions[user_id]["total_completion"],
+            "health_score": health_score_from_completion(completions[user_id]),
+            "risk": risks[user_id]
+        }
+        for user_id, user in zip(user_ids, users)
+    ]
+
+@router.get("/documents/queue")
+async def get_document_review_queue(
+    document_type: Optional[DocumentType] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Uploaded documents awaiting review across all students, oldest first"""
+    db = await get_database()
+    query = {"status": DocumentStatus.UPLOADED.value}
+    if document_type:
+        query["document_type"] = document_type.value
+    query.update(keyset_filter("updated_at", cursor, descending=False))
     
-    return {"students": students}
+    docs = await db.documents.find(
+        query,
+        {"user_id": 1, "document_type": 1, "status": 1, "file_url": 1, "file_name": 1, "file_size": 1, "updated_at": 1}
+    ).sort([("updated_at", 1), ("_id", 1)]).limit(limit + 1).to_list(length=limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["updated_at"], docs[-1]["_id"])
+    
+    # One lookup for every student on the page
+    user_ids = {doc["user_id"] for doc in docs if ObjectId.is_valid(doc["user_id"])}
+    users = {}
+    async for user in db.users.find(
+        {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+        {"full_name": 1, "email": 1, "student_id": 1}
+    ):
+        users[str(user["_id"])] = user
+    
+    documents = []
+    for doc in docs:
+        user = users.get(doc["user_id"], {})
+        doc["file_url"] = served_file_url(doc)
+        documents.append({
+            **mongo_to_dict(doc),
+            "student_name": user.get("full_name"),
+            "student_email": user.get("email"),
+            "student_id": user.get("student_id")
+        })
+    return {"documents": documents, "next_cursor": next_cursor}
+
+@router.get("/cache-stats")
+async def get_cache_stats(current_admin: dict = Depends(get_current_admin)):
+    return {"users": user_cache.stats()}
+
+@router.get("/login-stats")
+async def get_login_stats(current_admin: dict = Depends(get_current_admin)):
+    return {"login_admission": login_admission.stats()}
+
+@router.get("/indexes")
+async def get_index_report(current_admin: dict = Depends(get_current_admin)):
+    return {"indexes": await index_report()}
+
+@router.get("/notification-streams")
+async def get_notification_stream_stats(current_admin: dict = Depends(get_current_admin)):
+    return notification_hub.stats()
+
+@router.get("/courses/capacity")
+async def get_course_capacity(current_admin: dict = Depends(get_current_admin)):
+    """Seats taken, seats left and waitlist length per course"""
+    return {"courses": await capacity_report()}
+
+@router.get("/outbox")
+async def get_outbox_stats(current_admin: dict = Depends(get_current_admin)):
+    return await outbox_stats()
+
+@router.post("/broadcast", status_code=status.HTTP_202_ACCEPTED)
+async def broadcast_notification(
+    broadcast: BroadcastCreate,
+    background_tasks: BackgroundTasks,
+    current_admin: dict = Depends(get_current_admin)
+):
+    job = await create_broadcast_job(broadcast, current_admin["id"])
+    background_tasks.add_task(run_broadcast_job, job["id"], broadcast)
+    return {"message": "Broadcast queued", "job": job}
+
+@router.get("/broadcast/{job_id}")
+async def get_broadcast_status(job_id: str, current_admin: dict = Depends(get_current_admin)):
+    job = await get_broadcast_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Broadcast not found"
+        )
+    return job
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.utils.auth import get_current_user
 from app.utils.mongo import mongo_to_dict
-from app.utils.onboarding import calculate_completion, detect_risk, get_next_best_action
+from app.services.onboarding_service import OnboardingContext, get_onboarding_context
+from app.utils.onboarding import fee_paid_percentage
 from app.database.mongo import get_database
 from datetime import datetime
 
@@ -18,35 +19,30 @@ class ChatResponse(BaseModel):
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(
     message: ChatMessage,
-    current_user: dict = Depends(get_current_user)
+    onboarding: OnboardingContext = Depends(get_onboarding_context)
 ):
-    user_id = current_user["id"]
+    user_id = onboarding.user_id
+    user = onboarding.user
     db = await get_database()
     
     # Get student onboarding status
-    completion = await calculate_completion(user_id)
-    risk = await detect_risk(user_id)
-    next_action = await get_next_best_action(user_id)
-    
-    # Get user details
-    from bson import ObjectId
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    completion = await onboarding.completion()
+    risk = await onboarding.risk()
+    next_action = await onboarding.next_best_action()
+    health_score = await onboarding.health_score()
     
     # Get recent status
-    fee = await db.fees.find_one({"user_id": user_id})
+    fee = await onboarding.fee()
     fee_status = ""
     if fee:
-        fee_percentage = (fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 100 if fee.get("total_amount", 0) > 0 else 0
+        fee_percentage = fee_paid_percentage(fee)
         fee_status = f"Fee Payment: {fee_percentage:.1f}% completed (₹{fee.get('paid_amount', 0)}/₹{fee.get('total_amount', 0)})"
     
-    pending_docs = await db.documents.count_documents({
-        "user_id": user_id,
-        "status": {"$in": ["pending", "uploaded"]}
-    })
+    pending_docs = await onboarding.pending_documents()
     
-    registered_courses = await db.student_courses.count_documents({"user_id": user_id})
+    registered_courses = await onboarding.registered_courses()
     
-    hostel_app = await db.hostel_applications.find_one({"user_id": user_id})
+    hostel_app = await onboarding.hostel_application()
     hostel_status = "Not applied" if not hostel_app else hostel_app.get("status", "pending")
     
     # Build context prompt
@@ -54,7 +50,7 @@ async def chat_with_ai(
 Student: {user.get('full_name', 'Student')}
 Student ID: {user.get('student_id', 'N/A')}
 Onboarding Completion: {completion['total_completion']:.1f}%
-Health Score: {100 - (4 - sum([1 if completion['documents'] >= 25 else 0, 1 if completion['fees'] >= 25 else 0, 1 if completion['courses'] >= 25 else 0, 1 if completion['hostel'] >= 25 else 0])) * 25}
+Health Score: {health_score}
 Risk Level: {risk['level']}
 
 Current Status:
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.models.user import UserCreate, UserLogin, UserResponse
-from app.utils.auth import hash_password, verify_password, create_access_token, get_current_user
+from app.utils.auth import (
+    hash_password_async, verify_password_async, create_access_token, get_current_user, login_admission
+)
 from app.database.mongo import get_database
+from app.services.onboarding_service import refresh_onboarding_state
 from datetime import timedelta
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 
@@ -21,17 +25,26 @@ async def register(user_data: UserCreate):
     
     # Create user
     from datetime import datetime
+    async with login_admission:
+        password_hash = await hash_password_async(user_data.password)
     user_dict = {
         "email": user_data.email,
         "full_name": user_data.full_name,
         "student_id": user_data.student_id,
         "role": user_data.role.value,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": password_hash,
         "avatar_url": None,
         "created_at": datetime.utcnow()
     }
     
-    result = await db.users.insert_one(user_dict)
+    try:
+        result = await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # A concurrent registration won the unique email index
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     user_id = str(result.inserted_id)
     
     # Create initial fee record with structure
@@ -50,7 +63,6 @@ async def register(user_data: UserCreate):
         "remaining_amount": total_fee,
         "fee_structure": fee_structure,
         "description": "Semester fees breakdown",
-        "transactions": [],
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     })
@@ -76,6 +88,7 @@ async def register(user_data: UserCreate):
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         })
+    await refresh_onboarding_state(user_id)
     
     # Create access token
     access_token_expires = timedelta(minutes=30)
@@ -101,7 +114,11 @@ async def login(credentials: UserLogin):
     db = await get_database()
     
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    password_ok = False
+    if user:
+        async with login_admission:
+            password_ok = await verify_password_async(credentials.password, user["password_hash"])
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -1,23 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
 from app.utils.auth import get_current_user, get_current_admin
 from app.utils.mongo import mongo_to_dict
-from app.models.course import CourseCreate, CourseRegistration
+from app.utils.cache import etag_matches
+from app.models.course import CourseCapacityUpdate, CourseCreate, CourseRegistration
 from app.database.mongo import get_database
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.onboarding_service import OnboardingContext, get_onboarding_context
+from app.utils.onboarding import fee_paid_percentage
+from app.services.outbox import enqueue_notification
+from app.services.course_catalog import get_course_catalog, get_courses_by_id, invalidate_course_catalog
+from app.services.course_seats import (
+    claim_seats, release_seat, join_waitlist, leave_waitlist, promote_waitlist, seats_available, set_capacity,
+    waitlist_positions
+)
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 from datetime import datetime
+import asyncio
 
 router = APIRouter()
 
+DUPLICATE_KEY_ERROR = 11000
+
 @router.get("/")
-async def get_available_courses(current_user: dict = Depends(get_current_user)):
-    db = await get_database()
-    
-    cursor = db.courses.find({})
-    courses = []
-    async for course in cursor:
-        courses.append(mongo_to_dict(course))
-    
-    return {"courses": courses}
+async def get_available_courses(request: Request, current_user: dict = Depends(get_current_user)):
+    """The course catalog, served from the in-process cache with an ETag"""
+    catalog = await get_course_catalog()
+    headers = {"ETag": catalog.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), catalog.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
+
+@router.get("/seats")
+async def get_seats_available(current_user: dict = Depends(get_current_user)):
+    """Seats left per capped course; the cached catalog leaves these out because they change constantly"""
+    return {"seats_available": await seats_available()}
 
 @router.get("/my-courses")
 async def get_my_courses(current_user: dict = Depends(get_current_user)):
@@ -25,7 +43,7 @@ async def get_my_courses(current_user: dict = Depends(get_current_user)):
     user_id = current_user["id"]
     
     # Check fee payment status
-    fee = await db.fees.find_one({"user_id": user_id})
+    fee = await db.fees.find_one({"user_id": user_id}, {"total_amount": 1, "paid_amount": 1})
     fee_percentage = 0
     if fee and fee.get("total_amount", 0) > 0:
         fee_percentage = (fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 100
@@ -38,68 +56,114 @@ async def get_my_courses(current_user: dict = Depends(get_current_user)):
             "locked": True
         }
     
-    cursor = db.student_courses.find({"user_id": user_id})
+    registrations = await db.student_courses.find({"user_id": user_id}).to_list(length=None)
+    catalog = await get_courses_by_id(sc["course_id"] for sc in registrations)
     courses = []
-    async for sc in cursor:
-        course = await db.courses.find_one({"_id": ObjectId(sc["course_id"])})
+    for sc in registrations:
+        course = catalog.get(sc["course_id"])
         if course:
             sc_dict = mongo_to_dict(sc)
-            sc_dict["course"] = mongo_to_dict(course)
+            sc_dict["course"] = course
             courses.append(sc_dict)
     
+    waitlist = await db.course_waitlist.find({"user_id": user_id}).sort("joined_at", 1).to_list(length=None)
+    positions = {}
+    if waitlist:
+        catalog.update(await get_courses_by_id(entry["course_id"] for entry in waitlist))
+        positions = await waitlist_positions(user_id, [entry["course_id"] for entry in waitlist])
+    waiting = [
+        {
+            "course_id": entry["course_id"],
+            "course": catalog[entry["course_id"]],
+            "joined_at": entry["joined_at"],
+            "position": positions.get(entry["course_id"])
+        }
+        for entry in waitlist if entry["course_id"] in catalog
+    ]
+    
     return {
         "courses": courses,
+        "waitlist": waiting,
         "locked": False
     }
 
 @router.post("/register")
 async def register_courses(
     registration: CourseRegistration,
-    current_user: dict = Depends(get_current_user)
+    onboarding: OnboardingContext = Depends(get_onboarding_context)
 ):
+    """Register for several courses in a fixed number of round trips, with a result per course"""
     db = await get_database()
-    user_id = current_user["id"]
+    user_id = onboarding.user_id
     
     # Check fee payment status
-    fee = await db.fees.find_one({"user_id": user_id})
-    fee_percentage = 0
-    if fee and fee.get("total_amount", 0) > 0:
-        fee_percentage = (fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 100
-    
-    if fee_percentage < 50:
+    if fee_paid_percentage(await onboarding.fee()) < 50:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Please complete at least 50% fee payment to register for courses"
         )
     
-    registered_courses = []
-    for course_id in registration.course_ids:
-        # Check if already registered
-        existing = await db.student_courses.find_one({
-            "user_id": user_id,
-            "course_id": course_id
-        })
-        if existing:
-            continue
-        
-        # Verify course exists
-        course = await db.courses.find_one({"_id": ObjectId(course_id)})
-        if not course:
-            continue
-        
-        await db.student_courses.insert_one({
-            "user_id": user_id,
-            "course_id": course_id,
-            "registered_at": datetime.utcnow(),
-            "lms_activated": False
-        })
-        registered_courses.append(course_id)
-    
-    # Create notification
+    course_ids = list(dict.fromkeys(registration.course_ids))
+    catalog = await get_courses_by_id(course_ids)
+    results = {course_id: "not_found" for course_id in course_ids if course_id not in catalog}
+    # Courses already held are skipped up front so they don't take a second seat
+    async for sc in db.student_courses.find(
+        {"user_id": user_id, "course_id": {"$in": [course_id for course_id in course_ids if course_id in catalog]}},
+        {"course_id": 1}
+    ):
+        results[sc["course_id"]] = "already_registered"
+    candidates = [course_id for course_id in course_ids if course_id not in results]
+    
+    seats = await claim_seats(candidates)
+    to_register = [course_id for course_id in candidates if seats[course_id]]
+    full = [course_id for course_id in candidates if not seats[course_id]]
+    
+    if to_register:
+        now = datetime.utcnow()
+        try:
+            # Unordered, so one duplicate doesn't stop the rest; the (user_id, course_id) unique
+            # index settles double submits
+            await db.student_courses.insert_many(
+                [
+                    {"user_id": user_id, "course_id": course_id, "registered_at": now, "lms_activated": False}
+                    for course_id in to_register
+                ],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    raise
+                results[to_register[error["index"]]] = "already_registered"
+                # The seat claimed for the duplicate goes back (or to the waitlist)
+                await release_seat(to_register[error["index"]])
+    registered_courses = [course_id for course_id in to_register if course_id not in results]
+    for course_id in registered_courses:
+        results[course_id] = "registered"
+    
+    positions = {}
+    if full:
+        await join_waitlist(user_id, full)
+        # A seat may have freed up between the failed claim and joining the queue
+        promoted = await asyncio.gather(*(promote_waitlist(course_id) for course_id in full))
+        for course_id, promoted_users in zip(full, promoted):
+            if user_id in promoted_users:
+                results[course_id] = "registered"
+        positions = await waitlist_positions(user_id, [course_id for course_id in full if course_id not in results])
+        for course_id in positions:
+            results[course_id] = "waitlisted"
+        # Off the queue already: another request's drop or promotion may have handed this student the seat
+        unqueued = [course_id for course_id in full if course_id not in results]
+        if unqueued:
+            async for sc in db.student_courses.find(
+                {"user_id": user_id, "course_id": {"$in": unqueued}}, {"course_id": 1}
+            ):
+                results[sc["course_id"]] = "registered"
+    
     if registered_courses:
-        from app.services.notification_service import create_notification
-        from app.models.notification import NotificationType, NotificationCreate
-        await create_notification(NotificationCreate(
+        await onboarding.refresh(changed=["registered_courses"])
+        # Queued in the outbox; the worker delivers it after the response
+        await enqueue_notification(NotificationCreate(
             user_id=user_id,
             title="Course Registration",
             message=f"Successfully registered for {len(registered_courses)} course(s).",
@@ -107,7 +171,40 @@ async def register_courses(
             link="/courses"
         ))
     
-    return {"message": f"Registered for {len(registered_courses)} course(s)", "courses": registered_courses}
+    return {
+        "message": f"Registered for {len(registered_courses)} course(s)",
+        "courses": registered_courses,
+        "results": [
+            {"course_id": course_id, "status": results.get(course_id, "full"), "waitlist_position": positions.get(course_id)}
+            for course_id in course_ids
+        ]
+    }
+
+@router.delete("/{course_id}/registration")
+async def drop_course(
+    course_id: str,
+    onboarding: OnboardingContext = Depends(get_onboarding_context)
+):
+    """Drop a course; the seat goes to the first student on its waitlist"""
+    db = await get_database()
+    result = await db.student_courses.delete_one({"user_id": onboarding.user_id, "course_id": course_id})
+    if result.deleted_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not registered for this course"
+        )
+    await release_seat(course_id)
+    await onboarding.refresh(changed=["registered_courses"])
+    return {"message": "Course dropped"}
+
+@router.delete("/{course_id}/waitlist")
+async def leave_course_waitlist(course_id: str, current_user: dict = Depends(get_current_user)):
+    if not await leave_waitlist(current_user["id"], course_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not on the waitlist for this course"
+        )
+    return {"message": "Left the waitlist"}
 
 @router.post("/create", dependencies=[Depends(get_current_admin)])
 async def create_course(course_data: CourseCreate):
@@ -118,13 +215,29 @@ async def create_course(course_data: CourseCreate):
         "course_name": course_data.course_name,
         "credits": course_data.credits,
         "description": course_data.description,
+        "capacity": course_data.capacity,
+        "registered_count": 0,
         "created_at": datetime.utcnow()
     }
     
     result = await db.courses.insert_one(course)
     course["_id"] = result.inserted_id
+    invalidate_course_catalog()
     return mongo_to_dict(course)
 
+@router.put("/{course_id}/capacity", dependencies=[Depends(get_current_admin)])
+async def update_course_capacity(course_id: str, update: CourseCapacityUpdate):
+    """Set or remove a course's seat limit; seats it opens go to the waitlist"""
+    db = await get_database()
+    if not ObjectId.is_valid(course_id) or not await db.courses.find_one({"_id": ObjectId(course_id)}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+    promoted = await set_capacity(course_id, update.capacity)
+    invalidate_course_catalog()
+    return {"course_id": course_id, "capacity": update.capacity, "promoted": len(promoted)}
+
 @router.put("/{course_id}/activate-lms")
 async def activate_lms(
     course_id: str,
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from app.utils.auth import get_current_user, get_current_admin
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from app.utils.auth import get_current_user, get_current_admin, get_current_user_from_query
 from app.utils.mongo import mongo_to_dict
-from app.models.document import DocumentCreate, DocumentStatus
+from app.utils.cache import etag_matches
+from app.models.document import DocumentCreate, DocumentStatus, DocumentVerifyBulk
+from app.models.user import Role
 from app.database.mongo import get_database
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.onboarding_service import refresh_onboarding_state, refresh_onboarding_states
+from app.services.outbox import enqueue_notification, enqueue_notifications
+from app.services.blob_store import (
+    store_upload, release_blob, blob_path, document_file_url, legacy_upload_path, served_file_url
+)
 from bson import ObjectId
 from datetime import datetime
 from pathlib import Path
-import os
+import mimetypes
 import uuid
 
-UPLOADS_PATH = Path(__file__).parent.parent.parent / "uploads"
 ALLOWED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".doc", ".docx"}
 
 router = APIRouter()
@@ -30,6 +38,7 @@ async def get_documents(current_user: dict = Depends(get_current_user)):
     cursor = db.documents.find({"user_id": user_id})
     user_docs = {}
     async for doc in cursor:
+        doc["file_url"] = served_file_url(doc)
         doc_dict = mongo_to_dict(doc)
         user_docs[doc_dict["document_type"]] = doc_dict
     
@@ -69,9 +78,12 @@ async def upload_document(
     """Upload by URL (for backward compatibility)"""
     db = await get_database()
     user_id = current_user["id"]
+    if document_data.file_url and document_data.file_url.lstrip("/").startswith("uploads"):
+        # Stored files are only ever attached by upload-file; a client can't point a document at one
+        raise HTTPException(status_code=400, detail="file_url cannot point at stored uploads")
     file_url = document_data.file_url or f"/uploads/placeholder_{document_data.document_type.value}.pdf"
     
-    result = await db.documents.update_one(
+    previous = await db.documents.find_one_and_update(
         {
             "user_id": user_id,
             "document_type": document_data.document_type.value
@@ -81,30 +93,32 @@ async def upload_document(
                 "file_url": file_url,
                 "status": DocumentStatus.UPLOADED.value,
                 "updated_at": datetime.utcnow()
-            }
+            },
+            "$unset": {"blob": "", "sha256": "", "file_size": ""}
         },
+        projection={"blob": 1},
         upsert=True
     )
     
-    if result.upserted_id:
-        doc_id = str(result.upserted_id)
+    if previous:
+        doc_id = str(previous["_id"])
+        await release_blob(previous.get("blob"))
     else:
         doc = await db.documents.find_one({
             "user_id": user_id,
             "document_type": document_data.document_type.value
-        })
+        }, {"_id": 1})
         doc_id = str(doc["_id"])
+    await refresh_onboarding_state(user_id)
     
-    # Create notification
-    from app.services.notification_service import create_notification
-    from app.models.notification import NotificationType
-    await create_notification({
-        "user_id": user_id,
-        "title": "Document Uploaded",
-        "message": f"Your {document_data.document_type.value.replace('_', ' ')} has been uploaded successfully.",
-        "notification_type": NotificationType.TASK_COMPLETION,
-        "link": "/documents"
-    })
+    # Queued in the outbox; the worker delivers it after the response
+    await enqueue_notification(NotificationCreate(
+        user_id=user_id,
+        title="Document Uploaded",
+        message=f"Your {document_data.document_type.value.replace('_', ' ')} has been uploaded successfully.",
+        notification_type=NotificationType.TASK_COMPLETION,
+        link="/documents"
+    ))
     
     return {"message": "Document uploaded successfully", "document_id": doc_id}
 
@@ -132,40 +146,42 @@ async def upload_document_file(
             detail=f"File type not allowed. Use: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Create user uploads folder
-    user_uploads = UPLOADS_PATH / user_id
-    user_uploads.mkdir(parents=True, exist_ok=True)
+    # Stream into the content-addressed store off the event loop, enforcing MAX_UPLOAD_BYTES
+    sha256, file_size = await store_upload(file)
     
-    # Generate unique filename
-    safe_name = f"{document_type}_{uuid.uuid4().hex[:8]}{ext}"
-    file_path = user_uploads / safe_name
-    
-    # Save file
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
-    
-    # File URL (relative to backend)
-    file_url = f"/uploads/{user_id}/{safe_name}"
-    
-    # Update or create document record
-    await db.documents.update_one(
-        {"user_id": user_id, "document_type": document_type},
-        {
-            "$set": {
-                "file_url": file_url,
-                "status": DocumentStatus.UPLOADED.value,
-                "updated_at": datetime.utcnow(),
-                "file_name": file.filename
-            }
-        },
-        upsert=True
-    )
+    # Update or create document record; a new record's id is chosen up front so its file_url can name it
+    new_id = ObjectId()
+    try:
+        previous = await db.documents.find_one_and_update(
+            {"user_id": user_id, "document_type": document_type},
+            {
+                "$setOnInsert": {"_id": new_id, "file_url": document_file_url(new_id)},
+                "$set": {
+                    "status": DocumentStatus.UPLOADED.value,
+                    "updated_at": datetime.utcnow(),
+                    "file_name": file.filename,
+                    "file_size": file_size,
+                    "sha256": sha256,
+                    "blob": sha256
+                }
+            },
+            projection={"blob": 1, "file_url": 1},
+            upsert=True
+        )
+    except BaseException:
+        # No document points at the new blob, so drop the reference store_upload took for it
+        await release_blob(sha256)
+        raise
+    file_url = document_file_url(previous["_id"] if previous else new_id)
+    if previous:
+        # The replaced file (possibly this same blob) loses this document's reference
+        await release_blob(previous.get("blob"))
+        if previous.get("file_url") != file_url:
+            await db.documents.update_one({"_id": previous["_id"]}, {"$set": {"file_url": file_url}})
+    await refresh_onboarding_state(user_id)
     
-    # Create notification
-    from app.services.notification_service import create_notification
-    from app.models.notification import NotificationCreate, NotificationType
-    await create_notification(NotificationCreate(
+    # Queued in the outbox; the worker delivers it after the response
+    await enqueue_notification(NotificationCreate(
         user_id=user_id,
         title="Document Uploaded",
         message=f"Your {document_type.replace('_', ' ')} has been uploaded successfully.",
@@ -176,6 +192,135 @@ async def upload_document_file(
     return {"message": "Document uploaded successfully", "file_url": file_url}
 
 
+@router.get("/{document_id}/file")
+async def download_document_file(
+    document_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user_from_query)
+):
+    """Stream a document's file to its owner or an admin; accepts ?token= so it works as a plain link"""
+    db = await get_database()
+    doc = None
+    if ObjectId.is_valid(document_id):
+        doc = await db.documents.find_one(
+            {"_id": ObjectId(document_id)},
+            {"user_id": 1, "blob": 1, "file_name": 1, "file_url": 1}
+        )
+    # Other students' documents are reported as missing rather than forbidden
+    if not doc or (doc["user_id"] != current_user["id"] and current_user.get("role") != Role.ADMIN):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    
+    if not doc.get("blob"):
+        file_url = doc.get("file_url") or ""
+        if file_url.startswith(("http://", "https://")):
+            return RedirectResponse(file_url)
+        # Uploaded before the blob store and not migrated yet: still on disk under uploads/<user_id>/
+        legacy = legacy_upload_path(file_url, doc["user_id"])
+        if legacy is None or not legacy.is_file():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No file uploaded for this document")
+        file_name = doc.get("file_name") or legacy.name
+        return FileResponse(
+            legacy,
+            media_type=mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+            filename=file_name,
+            content_disposition_type="inline",
+            headers={"Cache-Control": "private, no-cache"}
+        )
+    
+    # Blobs are named by their SHA-256, so the hash is a strong validator for the content
+    headers = {"ETag": f'"{doc["blob"]}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    file_name = doc.get("file_name") or doc["blob"]
+    # FileResponse handles Range / If-Range and hands the path to the server (pathsend) when it supports it
+    return FileResponse(
+        blob_path(doc["blob"]),
+        media_type=mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+        filename=file_name,
+        content_disposition_type="inline",
+        headers=headers
+    )
+
+
+@router.put("/verify-bulk")
+async def verify_documents_bulk(
+    request: DocumentVerifyBulk,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Verify many documents in a fixed number of round trips, with a result per id"""
+    db = await get_database()
+    results = {}
+    object_ids = []
+    for document_id in dict.fromkeys(request.document_ids):
+        if ObjectId.is_valid(document_id):
+            object_ids.append(ObjectId(document_id))
+        else:
+            results[document_id] = "invalid_id"
+    
+    to_verify = []
+    async for doc in db.documents.find(
+        {"_id": {"$in": object_ids}},
+        {"user_id": 1, "document_type": 1, "status": 1}
+    ):
+        if doc.get("status") == DocumentStatus.VERIFIED.value:
+            results[str(doc["_id"])] = "already_verified"
+        else:
+            to_verify.append(doc)
+    
+    verified = 0
+    if to_verify:
+        now = datetime.utcnow()
+        batch = uuid.uuid4().hex
+        # The status guard keeps a concurrent verify from being counted twice; the batch stamp says which
+        # documents this call actually changed
+        result = await db.documents.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in to_verify]}, "status": {"$ne": DocumentStatus.VERIFIED.value}},
+            {
+                "$set": {
+                    "status": DocumentStatus.VERIFIED.value,
+                    "verified_by": current_admin["id"],
+                    "verified_at": now,
+                    "updated_at": now,
+                    "verified_batch": batch
+                }
+            }
+        )
+        verified = result.modified_count
+        changed = {
+            doc["_id"] async for doc in db.documents.find(
+                {"_id": {"$in": [doc["_id"] for doc in to_verify]}, "verified_batch": batch}, {"_id": 1}
+            )
+        }
+        for doc in to_verify:
+            if doc["_id"] not in changed:
+                results[str(doc["_id"])] = "already_verified"
+        to_verify = [doc for doc in to_verify if doc["_id"] in changed]
+    
+    if to_verify:
+        await refresh_onboarding_states(list({doc["user_id"] for doc in to_verify}))
+        await enqueue_notifications([
+            NotificationCreate(
+                user_id=doc["user_id"],
+                title="Document Verified",
+                message=f"Your {doc['document_type'].replace('_', ' ')} has been verified.",
+                notification_type=NotificationType.TASK_COMPLETION,
+                link="/documents"
+            )
+            for doc in to_verify
+        ])
+        for doc in to_verify:
+            results[str(doc["_id"])] = "verified"
+    
+    return {
+        "verified": verified,
+        "results": [
+            {"document_id": document_id, "status": results.get(document_id, "not_found")}
+            for document_id in dict.fromkeys(request.document_ids)
+        ]
+    }
+
+
 @router.put("/{document_id}/verify")
 async def verify_document(
     document_id: str,
@@ -203,16 +348,15 @@ async def verify_document(
     
     # Get document to create notification
     doc = await db.documents.find_one({"_id": ObjectId(document_id)})
+    await refresh_onboarding_state(doc["user_id"])
     
-    # Create notification
-    from app.services.notification_service import create_notification
-    from app.models.notification import NotificationType
-    await create_notification({
-        "user_id": doc["user_id"],
-        "title": "Document Verified",
-        "message": f"Your {doc['document_type'].replace('_', ' ')} has been verified.",
-        "notification_type": NotificationType.TASK_COMPLETION,
-        "link": "/documents"
-    })
+    # Queued in the outbox; the worker delivers it after the response
+    await enqueue_notification(NotificationCreate(
+        user_id=doc["user_id"],
+        title="Document Verified",
+        message=f"Your {doc['document_type'].replace('_', ' ')} has been verified.",
+        notification_type=NotificationType.TASK_COMPLETION,
+        link="/documents"
+    ))
     
     return {"message": "Document verified successfully"}
@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from app.utils.auth import get_current_user
+from app.utils.mongo import mongo_to_dict
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.models.fee import FeePayment
 from app.database.mongo import get_database
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.onboarding_service import refresh_onboarding_state
+from app.services.outbox import enqueue_notification
+from app.services.fee_service import (
+    RECENT_PAYMENTS_KEPT, get_fee_transactions, record_transaction
+)
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
+# get_fee_status returns these; the breakdown is static and the payments live in fee_transactions
+FEE_SUMMARY_PROJECTION = {"total_amount": 1, "paid_amount": 1, "remaining_amount": 1, "description": 1, "updated_at": 1}
+
+# A payment still marked in progress after this long is assumed to have died mid-request
+PAYMENT_REQUEST_STALE_SECONDS = 30
+
 FEE_STRUCTURE = [
     {"name": "Tuition Fee", "amount": 35000, "description": "Academic semester fees"},
     {"name": "Hostel Fee", "amount": 12000, "description": "Accommodation charges"},
@@ -21,7 +38,7 @@ async def get_fee_status(current_user: dict = Depends(get_current_user)):
     db = await get_database()
     user_id = current_user["id"]
     
-    fee = await db.fees.find_one({"user_id": user_id})
+    fee = await db.fees.find_one({"user_id": user_id}, FEE_SUMMARY_PROJECTION)
     if not fee:
         total = sum(item["amount"] for item in FEE_STRUCTURE)
         fee = {
@@ -31,71 +48,149 @@ async def get_fee_status(current_user: dict = Depends(get_current_user)):
             "remaining_amount": total,
             "fee_structure": FEE_STRUCTURE,
             "description": "Semester fees breakdown",
-            "transactions": [],
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        await db.fees.insert_one(fee)
-    else:
-        if not fee.get("fee_structure"):
-            fee["fee_structure"] = FEE_STRUCTURE
+        try:
+            await db.fees.insert_one(fee)
+            fee = {key: fee[key] for key in ["_id", *FEE_SUMMARY_PROJECTION]}
+        except DuplicateKeyError:
+            # A concurrent first request created it
+            fee = await db.fees.find_one({"user_id": user_id}, FEE_SUMMARY_PROJECTION)
     
-    fee["id"] = str(fee["_id"])
+    fee = mongo_to_dict(fee)
     fee["is_paid"] = fee.get("remaining_amount", 0) <= 0
     fee["paid_percentage"] = round((fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 100, 1)
     return fee
 
+async def _claim_idempotency_key(db, user_id: str, key: str, payment_data: FeePayment) -> Optional[dict]:
+    """Reserve `key` for this payment; returns the stored response if it was already completed"""
+    now = datetime.utcnow()
+    try:
+        await db.payment_requests.insert_one({
+            "user_id": user_id,
+            "key": key,
+            "amount": payment_data.amount,
+            "payment_method": payment_data.payment_method,
+            "status": "processing",
+            "created_at": now
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+    
+    existing = await db.payment_requests.find_one({"user_id": user_id, "key": key})
+    if existing is None:
+        # Released by a failed attempt in the meantime
+        return await _claim_idempotency_key(db, user_id, key, payment_data)
+    if existing["amount"] != payment_data.amount or existing["payment_method"] != payment_data.payment_method:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key was already used for a different payment"
+        )
+    if existing["status"] == "completed":
+        return existing["response"]
+    
+    if (now - existing["created_at"]).total_seconds() < PAYMENT_REQUEST_STALE_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A payment with this Idempotency-Key is still in progress"
+        )
+    # The first attempt died; if its charge went through, finish it, otherwise take the key over
+    fee = await db.fees.find_one(
+        {"user_id": user_id, "recent_payments.idempotency_key": key},
+        {"remaining_amount": 1, "recent_payments": {"$elemMatch": {"idempotency_key": key}}}
+    )
+    if fee:
+        transaction = fee["recent_payments"][0]
+        await record_transaction(user_id, transaction)
+        response = _payment_response(transaction, fee["remaining_amount"])
+        await _complete_idempotency_key(db, user_id, key, response)
+        return response
+    taken = await db.payment_requests.update_one(
+        {"_id": existing["_id"], "status": "processing", "created_at": existing["created_at"]},
+        {"$set": {"created_at": now}}
+    )
+    if taken.modified_count == 0:
+        return await _claim_idempotency_key(db, user_id, key, payment_data)
+    return None
+
+async def _complete_idempotency_key(db, user_id: str, key: str, response: dict) -> None:
+    await db.payment_requests.update_one(
+        {"user_id": user_id, "key": key},
+        {"$set": {"status": "completed", "response": response}}
+    )
+
+def _payment_response(transaction: dict, remaining_amount: float) -> dict:
+    transaction = {k: v for k, v in transaction.items() if k != "idempotency_key"}
+    return {
+        "message": "Payment successful",
+        "transaction": transaction,
+        "remaining_amount": remaining_amount
+    }
+
 @router.post("/pay")
 async def make_payment(
     payment_data: FeePayment,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: dict = Depends(get_current_user)
 ):
     db = await get_database()
     user_id = current_user["id"]
     
-    fee = await db.fees.find_one({"user_id": user_id})
-    if not fee:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Fee record not found"
-        )
+    if idempotency_key:
+        stored = await _claim_idempotency_key(db, user_id, idempotency_key, payment_data)
+        if stored is not None:
+            return stored
     
-    if payment_data.amount > fee["remaining_amount"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Payment amount exceeds remaining balance"
-        )
-    
-    # Create transaction
+    # Create transaction; created_at is cut to the millisecond MongoDB stores so replays match exactly
+    now = datetime.utcnow()
     transaction = {
         "id": str(uuid.uuid4()),
         "amount": payment_data.amount,
         "payment_method": payment_data.payment_method,
-        "transaction_id": f"TXN{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8].upper()}",
+        "transaction_id": f"TXN{now.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8].upper()}",
         "status": "completed",
-        "created_at": datetime.utcnow()
+        "created_at": now.replace(microsecond=now.microsecond // 1000 * 1000)
     }
+    if idempotency_key:
+        transaction["idempotency_key"] = idempotency_key
     
-    # Update fee
-    new_paid = fee["paid_amount"] + payment_data.amount
-    new_remaining = fee["total_amount"] - new_paid
-    
-    await db.fees.update_one(
-        {"user_id": user_id},
+    # One atomic update; the balance guard makes concurrent payments unable to overpay.
+    # The fee document keeps only the last few payments, which the ledger can be repaired from.
+    fee = await db.fees.find_one_and_update(
+        {"user_id": user_id, "remaining_amount": {"$gte": payment_data.amount}},
         {
-            "$set": {
-                "paid_amount": new_paid,
-                "remaining_amount": new_remaining,
-                "updated_at": datetime.utcnow()
-            },
-            "$push": {"transactions": transaction}
-        }
+            "$inc": {"paid_amount": payment_data.amount, "remaining_amount": -payment_data.amount},
+            "$set": {"updated_at": now},
+            "$push": {"recent_payments": {"$each": [transaction], "$slice": -RECENT_PAYMENTS_KEPT}}
+        },
+        projection={"remaining_amount": 1},
+        return_document=ReturnDocument.AFTER
     )
     
-    # Create notification
-    from app.services.notification_service import create_notification
-    from app.models.notification import NotificationCreate, NotificationType
-    await create_notification(NotificationCreate(
+    if fee is None:
+        if idempotency_key:
+            # Nothing was charged, so the same key may be retried
+            await db.payment_requests.delete_one({"user_id": user_id, "key": idempotency_key})
+        if not await db.fees.find_one({"user_id": user_id}, {"_id": 1}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Fee record not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Payment amount exceeds remaining balance"
+        )
+    
+    await record_transaction(user_id, transaction)
+    response = _payment_response(transaction, fee["remaining_amount"])
+    if idempotency_key:
+        await _complete_idempotency_key(db, user_id, idempotency_key, response)
+    await refresh_onboarding_state(user_id)
+    
+    # Queued in the outbox; the worker delivers it after the response
+    await enqueue_notification(NotificationCreate(
         user_id=user_id,
         title="Payment Received",
         message=f"Payment of ₹{payment_data.amount} has been received successfully.",
@@ -103,19 +198,12 @@ async def make_payment(
         link="/fees"
     ))
     
-    return {
-        "message": "Payment successful",
-        "transaction": transaction,
-        "remaining_amount": new_remaining
-    }
+    return response
 
 @router.get("/transactions")
-async def get_transactions(current_user: dict = Depends(get_current_user)):
-    db = await get_database()
-    user_id = current_user["id"]
-    
-    fee = await db.fees.find_one({"user_id": user_id})
-    if not fee:
-        return {"transactions": []}
-    
-    return {"transactions": fee.get("transactions", [])}
+async def get_transactions(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    return await get_fee_transactions(current_user["id"], limit, cursor)
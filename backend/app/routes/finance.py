@@ -0,0 +1,82 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.utils.auth import get_current_admin
+from app.utils.export import ExportFormat, export_response
+from app.services.finance_service import (
+    COLLECTION_EXPORT_COLUMNS, FEE_EXPORT_COLUMNS,
+    collection_summary, outstanding_summary, cohort_summary, iter_collections, iter_fees
+)
+
+router = APIRouter()
+
+DEFAULT_RANGE_DAYS = 30
+BELOW_HALF = 50
+
+
+def _date_range(start: Optional[date], end: Optional[date]) -> Tuple[datetime, datetime]:
+    # Both dates are inclusive; internally the range is [start 00:00, day after end 00:00)
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    return datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+
+
+@router.get("/collections")
+async def get_collections(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Payments received between two dates, totalled per day and per payment method"""
+    return await collection_summary(*_date_range(start, end))
+
+
+@router.get("/collections/export")
+async def export_collections(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Every payment between two dates, streamed"""
+    range_start, range_end = _date_range(start, end)
+    filename = f"collections-{range_start.date()}-{(range_end - timedelta(days=1)).date()}"
+    return export_response(iter_collections(range_start, range_end), COLLECTION_EXPORT_COLUMNS, format, filename)
+
+
+@router.get("/outstanding")
+async def get_outstanding(current_admin: dict = Depends(get_current_admin)):
+    """Billed, collected and outstanding fees, with students per paid-percentage band"""
+    return await outstanding_summary(BELOW_HALF)
+
+
+@router.get("/outstanding/export")
+async def export_outstanding(
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Every student who still owes fees, streamed"""
+    return export_response(iter_fees(outstanding_only=True), FEE_EXPORT_COLUMNS, format, "outstanding-fees")
+
+
+@router.get("/cohorts/below-half")
+async def get_below_half_cohort(
+    sample: int = Query(20, ge=0, le=100),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Students who have paid less than half their fees"""
+    return await cohort_summary(BELOW_HALF, sample)
+
+
+@router.get("/cohorts/below-half/export")
+async def export_below_half_cohort(
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Every student who has paid less than half their fees, streamed"""
+    return export_response(iter_fees(below_threshold=BELOW_HALF), FEE_EXPORT_COLUMNS, format, "below-half-paid")
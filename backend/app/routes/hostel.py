@@ -3,8 +3,15 @@ from app.utils.auth import get_current_user, get_current_admin
 from app.utils.mongo import mongo_to_dict
 from app.models.hostel import HostelPreference, HostelCreate, HostelStatus, MessStatus
 from app.database.mongo import get_database
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.onboarding_service import refresh_onboarding_state
+from app.services.outbox import enqueue_notification
+from app.services.hostel_allocator import allocate_pending_applications
+from app.services.hostel_rooms import assign_bed, create_rooms, hostel_availability, release_bed
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
@@ -122,13 +129,19 @@ async def apply_hostel(
         "allocated_at": None
     }
     
-    result = await db.hostel_applications.insert_one(application)
+    try:
+        result = await db.hostel_applications.insert_one(application)
+    except DuplicateKeyError:
+        # A second submit raced the first past the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Hostel application already submitted"
+        )
     application["_id"] = result.inserted_id
+    await refresh_onboarding_state(user_id)
     
-    # Create notification
-    from app.services.notification_service import create_notification
-    from app.models.notification import NotificationType, NotificationCreate
-    await create_notification(NotificationCreate(
+    # Queued in the outbox; the worker delivers it after the response
+    await enqueue_notification(NotificationCreate(
         user_id=user_id,
         title="Hostel Application Submitted",
         message="Your hostel application has been submitted successfully.",
@@ -165,12 +178,20 @@ async def register_mess(current_user: dict = Depends(get_current_user)):
 
 @router.get("/available")
 async def get_available_hostels(current_user: dict = Depends(get_current_user)):
+    """Hostels with live room and free-bed counts from hostel_rooms (briefly cached)"""
     db = await get_database()
+    availability = await hostel_availability()
     
     cursor = db.hostels.find({})
     hostels = []
     async for hostel in cursor:
-        hostels.append(mongo_to_dict(hostel))
+        hostel = mongo_to_dict(hostel)
+        counts = availability.get(hostel["name"], {})
+        hostel["rooms"] = counts.get("rooms", 0)
+        hostel["beds"] = counts.get("beds", 0)
+        hostel["free_beds"] = counts.get("free_beds", 0)
+        hostel["available_rooms"] = counts.get("rooms_with_free_beds", 0)
+        hostels.append(hostel)
     
     return {"hostels": hostels}
 
@@ -181,52 +202,88 @@ async def create_hostel(hostel_data: HostelCreate):
     hostel = {
         "name": hostel_data.name,
         "capacity": hostel_data.capacity,
-        "available_rooms": hostel_data.available_rooms,
+        "beds_per_room": hostel_data.beds_per_room,
         "created_at": datetime.utcnow()
     }
     
     result = await db.hostels.insert_one(hostel)
     hostel["_id"] = result.inserted_id
+    hostel["rooms"] = await create_rooms(hostel_data.name, hostel_data.capacity, hostel_data.beds_per_room)
     return mongo_to_dict(hostel)
 
+@router.post("/allocate-batch", dependencies=[Depends(get_current_admin)])
+async def allocate_hostels_batch(dry_run: bool = Query(False)):
+    """Allocate every pending application by preference and applied_at; dry_run returns the plan only"""
+    return await allocate_pending_applications(dry_run=dry_run)
+
 @router.put("/{application_id}/allocate", dependencies=[Depends(get_current_admin)])
 async def allocate_hostel(
     application_id: str,
     hostel_name: str = Query(...),
-    room_number: str = Query(...)
+    room_number: Optional[str] = Query(None)
 ):
+    """Allocate one application to a bed in the given room, or the hostel's first room with a free bed"""
     db = await get_database()
     
+    app = None
+    if ObjectId.is_valid(application_id):
+        app = await db.hostel_applications.find_one(
+            {"_id": ObjectId(application_id)},
+            {"user_id": 1, "status": 1, "allocated_hostel": 1, "allocated_room": 1}
+        )
+    if not app:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Application not found"
+        )
+    
+    allocated = app.get("status") == HostelStatus.ALLOCATED.value
+    previous_hostel, previous_room = app.get("allocated_hostel"), app.get("allocated_room")
+    if allocated and previous_hostel == hostel_name and previous_room and room_number in (None, previous_room):
+        return {"message": "Hostel allocated successfully", "hostel": hostel_name, "room": previous_room}
+    
+    room = await assign_bed(hostel_name, app["user_id"], room_number)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No free bed in {hostel_name}" + (f" room {room_number}" if room_number else "")
+        )
+    
+    # Guarded on the state we read, so two admins allocating the same application can't both take a bed
     result = await db.hostel_applications.update_one(
-        {"_id": ObjectId(application_id)},
+        {
+            "_id": app["_id"],
+            "status": app.get("status"),
+            "allocated_hostel": previous_hostel,
+            "allocated_room": previous_room
+        },
         {
             "$set": {
                 "allocated_hostel": hostel_name,
-                "allocated_room": room_number,
+                "allocated_room": room,
                 "status": HostelStatus.ALLOCATED.value,
                 "allocated_at": datetime.utcnow()
             }
         }
     )
-    
     if result.matched_count == 0:
+        await release_bed(hostel_name, room, app["user_id"])
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Application not found"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Application changed while allocating; please retry"
         )
+    if allocated and previous_hostel and previous_room:
+        await release_bed(previous_hostel, previous_room, app["user_id"])
     
-    # Get application to create notification
-    app = await db.hostel_applications.find_one({"_id": ObjectId(application_id)})
+    await refresh_onboarding_state(app["user_id"])
     
-    # Create notification
-    from app.services.notification_service import create_notification
-    from app.models.notification import NotificationType, NotificationCreate
-    await create_notification(NotificationCreate(
+    # Queued in the outbox; the worker delivers it after the response
+    await enqueue_notification(NotificationCreate(
         user_id=app["user_id"],
         title="Hostel Allocated",
-        message=f"Your hostel application has been approved. Hostel: {hostel_name}, Room: {room_number}",
+        message=f"Your hostel application has been approved. Hostel: {hostel_name}, Room: {room}",
         notification_type=NotificationType.TASK_COMPLETION,
         link="/hostel"
     ))
     
-    return {"message": "Hostel allocated successfully"}
+    return {"message": "Hostel allocated successfully", "hostel": hostel_name, "room": room}
@@ -1,17 +1,29 @@
-from fastapi import APIRouter, Depends
-from app.utils.auth import get_current_user
-from app.services.notification_service import get_user_notifications, mark_notification_read, get_unread_count
+import asyncio
+import json
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.utils.auth import get_current_user, get_current_user_from_query
+from app.services.notification_hub import notification_hub, TooManyConnections
+from app.services.notification_service import (
+    get_user_notifications, mark_notification_read, mark_all_notifications_read, get_unread_count
+)
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT_SECONDS", "15"))
+
 @router.get("/")
 async def get_notifications(
     unread_only: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     user_id = current_user["id"]
-    notifications = await get_user_notifications(user_id, unread_only)
-    return {"notifications": notifications}
+    return await get_user_notifications(user_id, unread_only, limit, cursor)
 
 @router.get("/unread-count")
 async def get_unread_notification_count(current_user: dict = Depends(get_current_user)):
@@ -19,6 +31,45 @@ async def get_unread_notification_count(current_user: dict = Depends(get_current
     count = await get_unread_count(user_id)
     return {"count": count}
 
+@router.get("/stream")
+async def stream_notifications(current_user: dict = Depends(get_current_user_from_query)):
+    """Server-sent events: `notification` for each new notification, `unread_count` on every change"""
+    user_id = current_user["id"]
+    try:
+        subscription = notification_hub.subscribe(user_id)
+    except TooManyConnections:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open notification streams"
+        )
+    
+    async def events():
+        try:
+            count = await get_unread_count(user_id)
+            yield f"retry: 5000\nevent: unread_count\ndata: {json.dumps({'count': count})}\n\n"
+            while True:
+                try:
+                    event = await subscription.next_event(STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    break
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            notification_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.put("/read-all")
+async def mark_all_as_read(current_user: dict = Depends(get_current_user)):
+    user_id = current_user["id"]
+    return await mark_all_notifications_read(user_id)
+
 @router.put("/{notification_id}/read")
 async def mark_as_read(
     notification_id: str,
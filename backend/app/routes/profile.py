@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from app.utils.auth import get_current_user
+from app.utils.auth import get_current_user, invalidate_cached_user, USER_PROJECTION
 from app.database.mongo import get_database
-from app.utils.onboarding import calculate_completion
+from app.utils.mongo import mongo_to_dict
+from app.services.onboarding_service import OnboardingContext, get_onboarding_context
 from bson import ObjectId
 
 router = APIRouter()
@@ -12,15 +13,9 @@ class ProfileUpdate(BaseModel):
     avatar_url: str = None
 
 @router.get("/")
-async def get_profile(current_user: dict = Depends(get_current_user)):
-    db = await get_database()
-    user_id = current_user["id"]
-    
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return None
-    
-    completion = await calculate_completion(user_id)
+async def get_profile(onboarding: OnboardingContext = Depends(get_onboarding_context)):
+    user = onboarding.user
+    completion = await onboarding.completion()
     
     profile_completion = 0
     if user.get("full_name"):
@@ -33,7 +28,7 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
         profile_completion += 25
     
     return {
-        "id": str(user["_id"]),
+        "id": onboarding.user_id,
         "email": user["email"],
         "full_name": user.get("full_name"),
         "student_id": user.get("student_id"),
@@ -63,9 +58,9 @@ async def update_profile(
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
+        invalidate_cached_user(user_id)
     
     # Get updated user
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-    user["id"] = str(user["_id"])
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
     
-    return {"message": "Profile updated successfully", "user": user}
+    return {"message": "Profile updated successfully", "user": mongo_to_dict(user)}
@@ -1,3 +1,15 @@
-from .notification_service import create_notification, get_user_notifications, mark_notification_read
+from .notification_service import (
+    create_notification, get_user_notifications, mark_notification_read, mark_all_notifications_read
+)
+from .onboarding_service import (
+    OnboardingContext, get_onboarding_context, get_onboarding_state, refresh_onboarding_state,
+    refresh_onboarding_states
+)
+from .outbox import enqueue, enqueue_many, enqueue_notification, enqueue_notifications
 
-__all__ = ["create_notification", "get_user_notifications", "mark_notification_read"]
+__all__ = [
+    "create_notification", "get_user_notifications", "mark_notification_read", "mark_all_notifications_read",
+    "OnboardingContext", "get_onboarding_context", "get_onboarding_state", "refresh_onboarding_state",
+    "refresh_onboarding_states",
+    "enqueue", "enqueue_many", "enqueue_notification", "enqueue_notifications"
+]
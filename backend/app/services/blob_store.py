@@ -0,0 +1,287 @@
+"""Content-addressed storage for uploaded files, reference-counted from documents records"""
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.database.mongo import get_database
+from app.utils.uploads import MAX_UPLOAD_BYTES, save_upload
+
+UPLOADS_PATH = Path(__file__).parent.parent.parent / "uploads"
+BLOBS_PATH = UPLOADS_PATH / "blobs"
+# Uploads land here first, before their hash (and so their final name) is known
+INCOMING_PATH = BLOBS_PATH / "incoming"
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+
+def blob_path(sha256: str) -> Path:
+    return BLOBS_PATH / sha256[:2] / sha256
+
+
+def document_file_url(document_id) -> str:
+    """Where a document's stored file is downloaded from (see documents.download_document_file)"""
+    return f"/api/documents/{document_id}/file"
+
+
+def served_file_url(doc: Dict) -> Optional[str]:
+    """A document's file_url as clients should use it: files not yet migrated are served by the endpoint too"""
+    if legacy_upload_path(doc.get("file_url"), doc.get("user_id")) is not None:
+        return document_file_url(doc["_id"])
+    return doc.get("file_url")
+
+
+def _place(staged: Path, sha256: str) -> None:
+    destination = blob_path(sha256)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # Always (re)place the file: the content is identical, and this restores a blob that a
+    # concurrent garbage collection just moved away
+    os.replace(staged, destination)
+
+
+async def _retain(sha256: str, size: int) -> None:
+    db = await get_database()
+    now = datetime.utcnow()
+    await db.blobs.update_one(
+        {"_id": sha256},
+        {"$inc": {"refcount": 1}, "$set": {"updated_at": now}, "$setOnInsert": {"size": size, "created_at": now}},
+        upsert=True
+    )
+
+
+async def store_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, int]:
+    """Store an upload as a blob and take a reference on it; returns (sha256, size)"""
+    staged = INCOMING_PATH / uuid.uuid4().hex
+    size, sha256 = await save_upload(file, staged, max_bytes)
+    try:
+        # Reference first, then place, so a collector never sees a placed but unreferenced new blob
+        await _retain(sha256, size)
+        await run_in_threadpool(_place, staged, sha256)
+    finally:
+        staged.unlink(missing_ok=True)
+    return sha256, size
+
+
+async def store_file(path: Path) -> Tuple[str, int]:
+    """Copy an existing file into the store and take a reference on it; used by the migration"""
+    def stage() -> Tuple[Path, str, int]:
+        INCOMING_PATH.mkdir(parents=True, exist_ok=True)
+        staged = INCOMING_PATH / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as source, open(staged, "wb") as out:
+            while chunk := source.read(1024 * 1024):
+                size += len(chunk)
+                digest.update(chunk)
+                out.write(chunk)
+        return staged, digest.hexdigest(), size
+
+    staged, sha256, size = await run_in_threadpool(stage)
+    try:
+        await _retain(sha256, size)
+        await run_in_threadpool(_place, staged, sha256)
+    finally:
+        staged.unlink(missing_ok=True)
+    return sha256, size
+
+
+async def release_blob(sha256: Optional[str]) -> None:
+    """Drop one reference; the file itself is removed later by collect_garbage"""
+    if not sha256:
+        return
+    db = await get_database()
+    await db.blobs.update_one(
+        {"_id": sha256, "refcount": {"$gt": 0}},
+        {"$inc": {"refcount": -1}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+
+
+def _scan_shard(shard: str) -> List[Tuple[str, float]]:
+    with os.scandir(shard) as entries:
+        return [(entry.name, entry.stat().st_mtime) for entry in entries if entry.is_file()]
+
+
+def _list_shards() -> List[str]:
+    if not BLOBS_PATH.is_dir():
+        return []
+    with os.scandir(BLOBS_PATH) as entries:
+        return sorted(entry.path for entry in entries if entry.is_dir() and len(entry.name) == 2)
+
+
+def _trash(sha256: str) -> Optional[Path]:
+    trashed = INCOMING_PATH / f"{sha256}.gc-{uuid.uuid4().hex[:8]}"
+    INCOMING_PATH.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(blob_path(sha256), trashed)
+    except FileNotFoundError:
+        return None
+    # Fresh mtime so _clean_incoming only sweeps it if this collection dies mid-way
+    os.utime(trashed)
+    return trashed
+
+
+def _clean_incoming(cutoff: float) -> int:
+    """Remove staging files abandoned by crashed uploads"""
+    removed = 0
+    if not INCOMING_PATH.is_dir():
+        return removed
+    with os.scandir(INCOMING_PATH) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+    return removed
+
+
+async def _collect(sha256: str, dry_run: bool) -> bool:
+    if dry_run:
+        return True
+    db = await get_database()
+    trashed = await run_in_threadpool(_trash, sha256)
+    if trashed is None:
+        return False
+    # An upload may have taken a reference between our check and the move; put the file back
+    if await db.blobs.find_one({"_id": sha256, "refcount": {"$gt": 0}}, {"_id": 1}):
+        await run_in_threadpool(os.replace, trashed, blob_path(sha256))
+        return False
+    await run_in_threadpool(trashed.unlink)
+    return True
+
+
+async def collect_garbage(grace_seconds: int = BLOB_GC_GRACE_SECONDS, dry_run: bool = False) -> Dict:
+    """Walk the blob tree one shard at a time and delete blobs no document references"""
+    db = await get_database()
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    mtime_cutoff = time.time() - grace_seconds
+    report = {"scanned": 0, "deleted": 0, "bytes_freed": 0, "incoming_removed": 0, "dry_run": dry_run}
+
+    for shard in await run_in_threadpool(_list_shards):
+        files = dict(await run_in_threadpool(_scan_shard, shard))
+        report["scanned"] += len(files)
+        records = {}
+        async for blob in db.blobs.find({"_id": {"$in": list(files)}}):
+            records[blob["_id"]] = blob
+
+        for sha256, mtime in files.items():
+            blob = records.get(sha256)
+            if blob is None:
+                # A file with no record at all; only touch it once it is clearly not mid-upload
+                if mtime >= mtime_cutoff:
+                    continue
+                size = os.path.getsize(os.path.join(shard, sha256))
+            elif blob["refcount"] > 0 or blob["updated_at"] >= cutoff:
+                continue
+            else:
+                size = blob.get("size", 0)
+                if not dry_run:
+                    result = await db.blobs.delete_one(
+                        {"_id": sha256, "refcount": {"$lte": 0}, "updated_at": {"$lt": cutoff}}
+                    )
+                    if result.deleted_count == 0:
+                        continue
+            if await _collect(sha256, dry_run):
+                report["deleted"] += 1
+                report["bytes_freed"] += size
+
+    if not dry_run:
+        report["incoming_removed"] = await run_in_threadpool(_clean_incoming, mtime_cutoff)
+    return report
+
+
+async def recount_blobs() -> int:
+    """Reset every blob's refcount to the number of documents pointing at it; returns blobs changed"""
+    db = await get_database()
+    counts = {}
+    async for row in db.documents.aggregate([
+        {"$match": {"blob": {"$type": "string"}}},
+        {"$group": {"_id": "$blob", "count": {"$sum": 1}}}
+    ]):
+        counts[row["_id"]] = row["count"]
+
+    changed = 0
+    now = datetime.utcnow()
+    async for blob in db.blobs.find({}, {"refcount": 1}):
+        expected = counts.pop(blob["_id"], 0)
+        if blob.get("refcount") != expected:
+            await db.blobs.update_one({"_id": blob["_id"]}, {"$set": {"refcount": expected, "updated_at": now}})
+            changed += 1
+    # Referenced blobs with no record at all
+    for sha256, count in counts.items():
+        path = blob_path(sha256)
+        size = path.stat().st_size if path.exists() else 0
+        await db.blobs.update_one(
+            {"_id": sha256},
+            {"$set": {"refcount": count, "updated_at": now}, "$setOnInsert": {"size": size, "created_at": now}},
+            upsert=True
+        )
+        changed += 1
+    return changed
+
+
+def legacy_upload_path(file_url: Optional[str], user_id: str) -> Optional[Path]:
+    """The local file behind an old /uploads/<user_id>/... URL, or None unless it is inside that user's own folder"""
+    file_url = file_url or ""
+    if not file_url.startswith("/uploads/") or not user_id:
+        return None
+    owner_dir = (UPLOADS_PATH / user_id).resolve()
+    # Checked on the resolved path, so ../ and ./ segments can't reach another student's files or the blobs
+    path = (UPLOADS_PATH / file_url[len("/uploads/"):]).resolve()
+    if owner_dir not in path.parents or (BLOBS_PATH.resolve() in path.parents):
+        return None
+    return path
+
+
+def _legacy_files() -> List[Path]:
+    files = []
+    with os.scandir(UPLOADS_PATH) as users:
+        for user_dir in users:
+            if user_dir.is_dir() and user_dir.name != "blobs":
+                with os.scandir(user_dir.path) as entries:
+                    files.extend(Path(entry.path).resolve() for entry in entries if entry.is_file())
+    return files
+
+
+async def migrate_legacy_uploads(delete_originals: bool = False) -> Dict:
+    """Move files under uploads/<user_id>/ into the blob store and repoint their documents"""
+    db = await get_database()
+    report = {"migrated": 0, "missing": 0, "originals_deleted": 0}
+
+    async for doc in db.documents.find(
+        {"blob": {"$exists": False}, "file_url": {"$regex": "^/uploads/"}},
+        {"file_url": 1, "user_id": 1}
+    ):
+        path = legacy_upload_path(doc["file_url"], doc["user_id"])
+        if path is None:
+            continue
+        if not path.is_file():
+            report["missing"] += 1
+            continue
+        sha256, size = await store_file(path)
+        result = await db.documents.update_one(
+            {"_id": doc["_id"], "blob": {"$exists": False}},
+            {"$set": {"blob": sha256, "sha256": sha256, "file_size": size, "file_url": document_file_url(doc["_id"])}}
+        )
+        if result.modified_count == 0:
+            # Re-uploaded while we were copying; that upload holds its own reference
+            await release_blob(sha256)
+            continue
+        report["migrated"] += 1
+
+    if delete_originals and UPLOADS_PATH.is_dir():
+        # Keep anything a not-yet-migrated document still points at
+        still_referenced = set()
+        async for doc in db.documents.find(
+            {"blob": {"$exists": False}, "file_url": {"$regex": "^/uploads/"}},
+            {"file_url": 1, "user_id": 1}
+        ):
+            path = legacy_upload_path(doc["file_url"], doc["user_id"])
+            if path is not None:
+                still_referenced.add(path)
+        for path in await run_in_threadpool(_legacy_files):
+            if path not in still_referenced:
+                await run_in_threadpool(path.unlink)
+                report["originals_deleted"] += 1
+    return report
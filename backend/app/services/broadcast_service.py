@@ -0,0 +1,108 @@
+"""Admin broadcasts: resolve a student filter and fan notifications out in the background"""
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from bson import ObjectId
+from app.database.mongo import get_database
+from app.models.notification import BroadcastCreate, BroadcastFilter, NotificationCreate
+from app.services.notification_service import create_notifications_bulk, BULK_CHUNK_SIZE
+from app.services.onboarding_service import refresh_onboarding_states
+from app.utils.mongo import mongo_to_dict
+
+async def _target_batches(target: BroadcastFilter, batch_size: int) -> AsyncIterator[List[str]]:
+    """Student ids matching the filter, a batch at a time so memory stays flat"""
+    db = await get_database()
+    query: Dict = {"role": "student"}
+    if target.student_ids is not None:
+        # An explicit empty selection targets nobody, not everybody
+        query["_id"] = {"$in": [ObjectId(user_id) for user_id in target.student_ids if ObjectId.is_valid(user_id)]}
+    
+    snapshot_query: Dict = {}
+    if target.risk_levels:
+        snapshot_query["risk.level"] = {"$in": target.risk_levels}
+    if target.max_completion is not None:
+        snapshot_query["completion.total_completion"] = {"$lte": target.max_completion}
+    
+    async def narrow(user_ids: List[str]) -> List[str]:
+        # Onboarding filters use the onboarding_state snapshots, hostel status the applications
+        if snapshot_query:
+            # Students without a snapshot yet would never match, so build theirs first
+            existing = {doc["_id"] async for doc in db.onboarding_state.find({"_id": {"$in": user_ids}}, {"_id": 1})}
+            await refresh_onboarding_states([user_id for user_id in user_ids if user_id not in existing])
+            user_ids = [doc["_id"] async for doc in db.onboarding_state.find(
+                {"_id": {"$in": user_ids}, **snapshot_query}, {"_id": 1}
+            )]
+        if target.hostel_status and user_ids:
+            user_ids = [doc["user_id"] async for doc in db.hostel_applications.find(
+                {"user_id": {"$in": user_ids}, "status": target.hostel_status}, {"user_id": 1}
+            )]
+        return user_ids
+    
+    batch = []
+    async for user in db.users.find(query, {"_id": 1}).batch_size(batch_size):
+        batch.append(str(user["_id"]))
+        if len(batch) >= batch_size:
+            narrowed = await narrow(batch)
+            if narrowed:
+                yield narrowed
+            batch = []
+    if batch:
+        narrowed = await narrow(batch)
+        if narrowed:
+            yield narrowed
+
+async def create_broadcast_job(broadcast: BroadcastCreate, created_by: str) -> Dict:
+    db = await get_database()
+    job = {
+        "title": broadcast.title,
+        "message": broadcast.message,
+        "notification_type": broadcast.notification_type.value,
+        "link": broadcast.link,
+        "filter": broadcast.filter.model_dump(exclude_none=True),
+        "status": "queued",
+        "sent": 0,
+        "created_by": created_by,
+        "created_at": datetime.utcnow(),
+        "started_at": None,
+        "finished_at": None,
+        "error": None
+    }
+    result = await db.broadcast_jobs.insert_one(job)
+    job["_id"] = result.inserted_id
+    return mongo_to_dict(job)
+
+async def run_broadcast_job(job_id: str, broadcast: BroadcastCreate, batch_size: int = BULK_CHUNK_SIZE):
+    """Send a queued broadcast, recording progress on its job document"""
+    db = await get_database()
+    job_filter = {"_id": ObjectId(job_id)}
+    await db.broadcast_jobs.update_one(
+        job_filter, {"$set": {"status": "running", "started_at": datetime.utcnow()}}
+    )
+    sent = 0
+    try:
+        async for user_ids in _target_batches(broadcast.filter, batch_size):
+            sent += await create_notifications_bulk([
+                NotificationCreate(
+                    user_id=user_id,
+                    title=broadcast.title,
+                    message=broadcast.message,
+                    notification_type=broadcast.notification_type,
+                    link=broadcast.link
+                )
+                for user_id in user_ids
+            ], chunk_size=batch_size)
+            await db.broadcast_jobs.update_one(job_filter, {"$set": {"sent": sent}})
+    except Exception as e:
+        await db.broadcast_jobs.update_one(job_filter, {"$set": {
+            "status": "failed", "sent": sent, "error": str(e), "finished_at": datetime.utcnow()
+        }})
+        raise
+    await db.broadcast_jobs.update_one(job_filter, {"$set": {
+        "status": "completed", "sent": sent, "finished_at": datetime.utcnow()
+    }})
+
+async def get_broadcast_job(job_id: str) -> Optional[Dict]:
+    db = await get_database()
+    if not ObjectId.is_valid(job_id):
+        return None
+    job = await db.broadcast_jobs.find_one({"_id": ObjectId(job_id)})
+    return mongo_to_dict(job) if job else None
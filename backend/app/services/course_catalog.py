@@ -0,0 +1,78 @@
+"""In-process copy of the course catalog, loaded at startup and rebuilt when a course is created"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+from bson import ObjectId
+from app.database.mongo import get_database
+from app.utils.mongo import mongo_to_dict
+
+# create_course only invalidates the worker that served it; other workers pick the change up within this
+CATALOG_REFRESH_SECONDS = float(os.getenv("COURSE_CATALOG_REFRESH_SECONDS", "300"))
+# Seat counts change on every registration and drop, so they are read live (see course_seats.seats_available)
+CATALOG_PROJECTION = {"registered_count": 0}
+
+
+class CourseCatalog:
+    """One immutable snapshot: courses by id, plus the catalog response already encoded"""
+
+    def __init__(self, courses: List[Dict]):
+        self.courses: Dict[str, Dict] = {course["id"]: course for course in courses}
+        self.body: bytes = json.dumps({"courses": courses}, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.loaded_at = time.monotonic()
+
+
+_catalog: Optional[CourseCatalog] = None
+_load_lock = asyncio.Lock()
+
+
+async def load_course_catalog() -> CourseCatalog:
+    """Read every course and replace the cached snapshot"""
+    global _catalog
+    db = await get_database()
+    courses = [mongo_to_dict(course) async for course in db.courses.find({}, CATALOG_PROJECTION).sort("_id", 1)]
+    _catalog = CourseCatalog(courses)
+    return _catalog
+
+
+async def get_course_catalog() -> CourseCatalog:
+    """The cached snapshot, reloading it when missing or older than CATALOG_REFRESH_SECONDS"""
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - catalog.loaded_at < CATALOG_REFRESH_SECONDS:
+        return catalog
+    async with _load_lock:
+        # Another request may have reloaded it while we waited
+        if _catalog is not catalog and _catalog is not None:
+            return _catalog
+        return await load_course_catalog()
+
+
+def invalidate_course_catalog() -> None:
+    """Drop the snapshot; the next read reloads it. Call after any write to the courses collection"""
+    global _catalog
+    _catalog = None
+
+
+async def get_courses_by_id(course_ids: Iterable[str]) -> Dict[str, Dict]:
+    """Resolve course ids from the catalog, with one query for any it doesn't have yet; treat results as read-only"""
+    catalog = await get_course_catalog()
+    found = {}
+    missing = set()
+    for course_id in course_ids:
+        course = catalog.courses.get(course_id)
+        if course is not None:
+            found[course_id] = course
+        elif ObjectId.is_valid(course_id):
+            missing.add(course_id)
+    if missing:
+        db = await get_database()
+        async for course in db.courses.find(
+            {"_id": {"$in": [ObjectId(course_id) for course_id in missing]}}, CATALOG_PROJECTION
+        ):
+            found[str(course["_id"])] = mongo_to_dict(course)
+            # Created in another worker since this snapshot was taken
+            invalidate_course_catalog()
+    return found
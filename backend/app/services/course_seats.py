@@ -0,0 +1,234 @@
+"""Course seat counters and the first-come, first-served waitlist (the course_waitlist collection)"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.database.mongo import get_database
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.onboarding_service import refresh_onboarding_states
+from app.services.outbox import enqueue_notifications
+
+# A course takes a seat when it has no capacity or fewer registrations than its capacity. The check and
+# the increment are one document update, so concurrent registrations can't both take the last seat.
+_HAS_SEAT = {"$or": [
+    {"capacity": None},
+    {"$expr": {"$lt": [{"$ifNull": ["$registered_count", 0]}, "$capacity"]}}
+]}
+
+
+async def claim_seat(course_id: str) -> bool:
+    """Take a seat in a course; False when it is full (or doesn't exist)"""
+    if not ObjectId.is_valid(course_id):
+        return False
+    db = await get_database()
+    course = await db.courses.find_one_and_update(
+        {"_id": ObjectId(course_id), **_HAS_SEAT},
+        {"$inc": {"registered_count": 1}},
+        projection={"_id": 1}
+    )
+    return course is not None
+
+
+async def claim_seats(course_ids: Iterable[str]) -> Dict[str, bool]:
+    """claim_seat for several courses at once"""
+    course_ids = list(course_ids)
+    claimed = await asyncio.gather(*(claim_seat(course_id) for course_id in course_ids))
+    return dict(zip(course_ids, claimed))
+
+
+async def release_seat(course_id: str) -> List[str]:
+    """Give up a seat: it passes straight to the head of the waitlist, or back to the course"""
+    db = await get_database()
+    # Handing the seat over directly means a new registration can't jump the queue for it
+    user_id = await _seat_next_in_line(db, course_id)
+    if user_id is None:
+        await _return_seat(db, course_id)
+        return []
+    await _notify_promoted(db, course_id, [user_id])
+    return [user_id]
+
+
+async def _return_seat(db, course_id: str) -> None:
+    await db.courses.update_one(
+        {"_id": ObjectId(course_id), "registered_count": {"$gt": 0}},
+        {"$inc": {"registered_count": -1}}
+    )
+
+
+async def join_waitlist(user_id: str, course_ids: List[str]) -> None:
+    """Queue a student for full courses"""
+    if not course_ids:
+        return
+    db = await get_database()
+    now = datetime.utcnow()
+    # Re-joining keeps the original place in the queue
+    await db.course_waitlist.bulk_write(
+        [
+            UpdateOne(
+                {"course_id": course_id, "user_id": user_id},
+                {"$setOnInsert": {"joined_at": now}},
+                upsert=True
+            )
+            for course_id in course_ids
+        ],
+        ordered=False
+    )
+
+
+async def waitlist_positions(user_id: str, course_ids: List[str]) -> Dict[str, int]:
+    """A student's 1-based position in each of the given course queues they are on"""
+    db = await get_database()
+    entries = await db.course_waitlist.find(
+        {"user_id": user_id, "course_id": {"$in": course_ids}},
+        {"course_id": 1, "joined_at": 1}
+    ).to_list(length=None)
+
+    async def position(entry: Dict) -> int:
+        ahead = await db.course_waitlist.count_documents({
+            "course_id": entry["course_id"],
+            "$or": [
+                {"joined_at": {"$lt": entry["joined_at"]}},
+                {"joined_at": entry["joined_at"], "_id": {"$lt": entry["_id"]}}
+            ]
+        })
+        return ahead + 1
+
+    positions = await asyncio.gather(*(position(entry) for entry in entries))
+    return {entry["course_id"]: value for entry, value in zip(entries, positions)}
+
+
+async def leave_waitlist(user_id: str, course_id: str) -> bool:
+    db = await get_database()
+    result = await db.course_waitlist.delete_one({"course_id": course_id, "user_id": user_id})
+    return result.deleted_count > 0
+
+
+async def _seat_next_in_line(db, course_id: str) -> Optional[str]:
+    """Register the oldest waitlisted student into a seat the caller already holds; None if nobody is waiting"""
+    while True:
+        entry = await db.course_waitlist.find_one_and_delete(
+            {"course_id": course_id},
+            sort=[("joined_at", 1), ("_id", 1)]
+        )
+        if entry is None:
+            return None
+        try:
+            await db.student_courses.insert_one({
+                "user_id": entry["user_id"],
+                "course_id": course_id,
+                "registered_at": datetime.utcnow(),
+                "lms_activated": False,
+                "from_waitlist": True
+            })
+            return entry["user_id"]
+        except DuplicateKeyError:
+            # Registered some other way while queued; the seat goes to the next in line
+            continue
+
+
+async def _notify_promoted(db, course_id: str, user_ids: List[str]) -> None:
+    if not user_ids:
+        return
+    course = await db.courses.find_one({"_id": ObjectId(course_id)}, {"course_code": 1, "course_name": 1})
+    course_name = f"{course['course_code']} {course['course_name']}" if course else "a course"
+    await refresh_onboarding_states(user_ids)
+    await enqueue_notifications([
+        NotificationCreate(
+            user_id=user_id,
+            title="Seat Available",
+            message=f"A seat opened up and you are now registered for {course_name}.",
+            notification_type=NotificationType.TASK_COMPLETION,
+            link="/courses"
+        )
+        for user_id in user_ids
+    ])
+
+
+async def promote_waitlist(course_id: str) -> List[str]:
+    """Register waitlisted students, oldest first, while the course has free seats"""
+    db = await get_database()
+    promoted = []
+    while await claim_seat(course_id):
+        user_id = await _seat_next_in_line(db, course_id)
+        if user_id is None:
+            await _return_seat(db, course_id)
+            break
+        promoted.append(user_id)
+    await _notify_promoted(db, course_id, promoted)
+    return promoted
+
+
+async def seats_available() -> Dict[str, int]:
+    """Seats left in every course that has a capacity, read live from the seat counters"""
+    db = await get_database()
+    return {
+        str(course["_id"]): max(course["capacity"] - course.get("registered_count", 0), 0)
+        async for course in db.courses.find({"capacity": {"$ne": None}}, {"capacity": 1, "registered_count": 1})
+    }
+
+
+async def capacity_report() -> List[Dict]:
+    """Capacity, seats taken and waitlist length for every course"""
+    db = await get_database()
+    waiting = {}
+    async for row in db.course_waitlist.aggregate([{"$group": {"_id": "$course_id", "count": {"$sum": 1}}}]):
+        waiting[row["_id"]] = row["count"]
+
+    report = []
+    async for course in db.courses.find(
+        {},
+        {"course_code": 1, "course_name": 1, "capacity": 1, "registered_count": 1}
+    ).sort("course_code", 1):
+        course_id = str(course["_id"])
+        capacity = course.get("capacity")
+        registered = course.get("registered_count", 0)
+        report.append({
+            "course_id": course_id,
+            "course_code": course.get("course_code"),
+            "course_name": course.get("course_name"),
+            "capacity": capacity,
+            "registered": registered,
+            "seats_available": max(capacity - registered, 0) if capacity is not None else None,
+            "waitlisted": waiting.get(course_id, 0)
+        })
+    return report
+
+
+async def set_capacity(course_id: str, capacity: Optional[int]) -> List[str]:
+    """Change a course's capacity (None for unlimited) and fill any seats it opens from the waitlist"""
+    db = await get_database()
+    # Courses that were uncapped may never have counted their registrations (or only the newer ones),
+    # so the counter is brought up to the student_courses count along with the capacity
+    while True:
+        course = await db.courses.find_one({"_id": ObjectId(course_id)}, {"registered_count": 1})
+        if course is None:
+            return []
+        stored = course.get("registered_count")
+        registered = await db.student_courses.count_documents({"course_id": course_id})
+        # A counter ahead of the count is a claim whose registration hasn't been inserted yet
+        result = await db.courses.update_one(
+            {"_id": ObjectId(course_id), "registered_count": stored},
+            {"$set": {"capacity": capacity, "registered_count": max(registered, stored or 0)}}
+        )
+        # Otherwise a seat was claimed or released in between; read both again
+        if result.matched_count:
+            break
+    return await promote_waitlist(course_id)
+
+
+async def recount_seats() -> int:
+    """Reset every course's registered_count from student_courses; returns courses changed"""
+    db = await get_database()
+    counts = {}
+    async for row in db.student_courses.aggregate([{"$group": {"_id": "$course_id", "count": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["count"]
+
+    changed = 0
+    async for course in db.courses.find({}, {"registered_count": 1}):
+        expected = counts.get(str(course["_id"]), 0)
+        if course.get("registered_count") != expected:
+            await db.courses.update_one({"_id": course["_id"]}, {"$set": {"registered_count": expected}})
+            changed += 1
+    return changed
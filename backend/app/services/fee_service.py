@@ -0,0 +1,82 @@
+"""Fee payment ledger (the fee_transactions collection)"""
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from app.database.mongo import get_database
+from app.utils.mongo import mongo_to_dict
+from app.utils.pagination import clamp_page_size, encode_cursor, keyset_filter
+
+# The fee document keeps only this many recent transactions, so a payment whose ledger write was
+# interrupted can still be recovered from it
+RECENT_PAYMENTS_KEPT = 20
+TRANSACTION_LIST_PROJECTION = {"user_id": 0, "idempotency_key": 0}
+
+
+def _ledger_update(user_id: str, transaction: Dict) -> UpdateOne:
+    # Keyed by the transaction's own id, so recording the same payment twice is harmless
+    return UpdateOne(
+        {"id": transaction["id"]},
+        {"$setOnInsert": {**transaction, "user_id": user_id}},
+        upsert=True
+    )
+
+
+async def record_transaction(user_id: str, transaction: Dict) -> None:
+    """Write a charged payment to the ledger; safe to repeat for the same transaction"""
+    db = await get_database()
+    # Same write as the migration and repair paths, so the three can't drift apart
+    await db.fee_transactions.bulk_write([_ledger_update(user_id, transaction)])
+
+
+async def get_fee_transactions(user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
+    """One page of a student's payments, newest first"""
+    db = await get_database()
+    page_size = clamp_page_size(limit)
+    query = {"user_id": user_id}
+    query.update(keyset_filter("created_at", cursor))
+
+    docs = await db.fee_transactions.find(query, TRANSACTION_LIST_PROJECTION).sort(
+        [("created_at", -1), ("_id", -1)]
+    ).limit(page_size + 1).to_list(length=page_size + 1)
+
+    next_cursor = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+
+    # The ledger's own _id is internal; the transaction keeps its public "id"
+    transactions = []
+    for doc in docs:
+        doc.pop("_id")
+        transactions.append(mongo_to_dict(doc))
+    return {"transactions": transactions, "next_cursor": next_cursor}
+
+
+async def migrate_embedded_transactions(batch_size: int = 500) -> Dict:
+    """Copy every fees.transactions array into fee_transactions, then drop the arrays"""
+    db = await get_database()
+    report = {"fees": 0, "transactions": 0}
+    async for fee in db.fees.find({"transactions.0": {"$exists": True}}, {"user_id": 1, "transactions": 1}):
+        requests: List[UpdateOne] = []
+        for index, transaction in enumerate(fee["transactions"]):
+            # Older entries may lack an id; derive a stable one so re-running stays idempotent
+            transaction.setdefault("id", f"{fee['_id']}-{index}")
+            requests.append(_ledger_update(fee["user_id"], transaction))
+        for start in range(0, len(requests), batch_size):
+            await db.fee_transactions.bulk_write(requests[start:start + batch_size], ordered=False)
+        await db.fees.update_one({"_id": fee["_id"]}, {"$unset": {"transactions": ""}})
+        report["fees"] += 1
+        report["transactions"] += len(requests)
+    return report
+
+
+async def repair_ledger() -> int:
+    """Record any recent payment that was charged but never reached the ledger; returns how many"""
+    db = await get_database()
+    recorded = 0
+    async for fee in db.fees.find({"recent_payments.0": {"$exists": True}}, {"user_id": 1, "recent_payments": 1}):
+        result = await db.fee_transactions.bulk_write(
+            [_ledger_update(fee["user_id"], transaction) for transaction in fee["recent_payments"]],
+            ordered=False
+        )
+        recorded += result.upserted_count
+    return recorded
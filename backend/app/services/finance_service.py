@@ -0,0 +1,215 @@
+"""Fee collection analytics over the fees and fee_transactions collections"""
+from datetime import datetime
+from typing import AsyncIterator, Dict, List
+from bson import ObjectId
+from app.database.mongo import get_database
+
+# Upper edges of the paid-percentage bands in outstanding reports; fully paid students land in "100%"
+PAID_BANDS = [0, 25, 50, 75, 100]
+EXPORT_BATCH_SIZE = 1000
+
+COLLECTION_EXPORT_COLUMNS = [
+    "created_at", "transaction_id", "amount", "payment_method", "status",
+    "user_id", "student_id", "student_name", "student_email"
+]
+FEE_EXPORT_COLUMNS = [
+    "user_id", "student_id", "student_name", "student_email",
+    "total_amount", "paid_amount", "remaining_amount", "paid_percentage"
+]
+
+
+def _paid_percentage():
+    return {"$cond": [
+        {"$gt": ["$total_amount", 0]},
+        {"$multiply": [{"$divide": ["$paid_amount", "$total_amount"]}, 100]},
+        100
+    ]}
+
+
+def _below(threshold: float) -> Dict:
+    # paid / total < threshold%, written without a division so it can run as a plain $expr match
+    return {"$expr": {"$lt": ["$paid_amount", {"$multiply": ["$total_amount", threshold / 100]}]}}
+
+
+def _sum_group(**extra) -> Dict:
+    return {"$group": {"_id": None, **extra}}
+
+
+async def _first(pipeline_result) -> Dict:
+    async for row in pipeline_result:
+        return row
+    return {}
+
+
+async def collection_summary(start: datetime, end: datetime) -> Dict:
+    """Payments received in [start, end): totals, per day and per payment method"""
+    db = await get_database()
+    group_fields = {"amount": {"$sum": "$amount"}, "payments": {"$sum": 1}}
+    facets = await _first(db.fee_transactions.aggregate([
+        {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+        {"$facet": {
+            "totals": [_sum_group(**group_fields)],
+            "by_day": [
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}, **group_fields}},
+                {"$sort": {"_id": 1}}
+            ],
+            "by_method": [
+                {"$group": {"_id": "$payment_method", **group_fields}},
+                {"$sort": {"amount": -1}}
+            ]
+        }}
+    ]))
+    totals = (facets.get("totals") or [{}])[0]
+    return {
+        "start": start,
+        "end": end,
+        "total_amount": totals.get("amount", 0),
+        "payments": totals.get("payments", 0),
+        "by_day": [{"date": row["_id"], "amount": row["amount"], "payments": row["payments"]} for row in facets.get("by_day", [])],
+        "by_method": [
+            {"payment_method": row["_id"], "amount": row["amount"], "payments": row["payments"]}
+            for row in facets.get("by_method", [])
+        ]
+    }
+
+
+async def outstanding_summary(below_threshold: float = 50) -> Dict:
+    """Billed, collected and outstanding totals, students per paid-percentage band, and the low payers"""
+    db = await get_database()
+    money = {
+        "students": {"$sum": 1},
+        "billed": {"$sum": "$total_amount"},
+        "collected": {"$sum": "$paid_amount"},
+        "outstanding": {"$sum": "$remaining_amount"}
+    }
+    facets = await _first(db.fees.aggregate([
+        {"$project": {"total_amount": 1, "paid_amount": 1, "remaining_amount": 1, "paid_percentage": _paid_percentage()}},
+        {"$facet": {
+            "totals": [_sum_group(**money)],
+            "bands": [{"$bucket": {
+                "groupBy": "$paid_percentage",
+                "boundaries": PAID_BANDS,
+                "default": 100,
+                "output": {"students": {"$sum": 1}, "outstanding": {"$sum": "$remaining_amount"}}
+            }}],
+            "below_threshold": [{"$match": _below(below_threshold)}, _sum_group(**money)]
+        }}
+    ]))
+    totals = (facets.get("totals") or [{}])[0]
+    below = (facets.get("below_threshold") or [{}])[0]
+    bands = {row["_id"]: row for row in facets.get("bands", [])}
+    return {
+        "students": totals.get("students", 0),
+        "billed": totals.get("billed", 0),
+        "collected": totals.get("collected", 0),
+        "outstanding": totals.get("outstanding", 0),
+        "bands": [
+            {
+                "band": f"{low}-{high}%" if high is not None else "100%",
+                "students": bands.get(low, {}).get("students", 0),
+                "outstanding": bands.get(low, {}).get("outstanding", 0)
+            }
+            for low, high in zip(PAID_BANDS, PAID_BANDS[1:] + [None])
+        ],
+        "below_threshold": {
+            "threshold": below_threshold,
+            "students": below.get("students", 0),
+            "outstanding": below.get("outstanding", 0)
+        }
+    }
+
+
+async def cohort_summary(threshold: float = 50, sample_size: int = 20) -> Dict:
+    """Students below `threshold`% paid: their totals and the furthest-behind few"""
+    db = await get_database()
+    facets = await _first(db.fees.aggregate([
+        {"$match": _below(threshold)},
+        {"$project": {"user_id": 1, "total_amount": 1, "paid_amount": 1, "remaining_amount": 1, "paid_percentage": _paid_percentage()}},
+        {"$facet": {
+            "totals": [_sum_group(
+                students={"$sum": 1},
+                outstanding={"$sum": "$remaining_amount"},
+                average_paid_percentage={"$avg": "$paid_percentage"}
+            )],
+            "furthest_behind": [
+                {"$sort": {"paid_percentage": 1, "remaining_amount": -1}},
+                {"$limit": sample_size}
+            ]
+        }}
+    ]))
+    totals = (facets.get("totals") or [{}])[0]
+    return {
+        "threshold": threshold,
+        "students": totals.get("students", 0),
+        "outstanding": totals.get("outstanding", 0),
+        "average_paid_percentage": round(totals.get("average_paid_percentage") or 0, 1),
+        "furthest_behind": await _with_students(_fee_row(fee) for fee in facets.get("furthest_behind", []))
+    }
+
+
+def _fee_row(fee: Dict) -> Dict:
+    total = fee.get("total_amount") or 0
+    paid = fee.get("paid_amount") or 0
+    return {
+        "user_id": fee["user_id"],
+        "total_amount": total,
+        "paid_amount": paid,
+        "remaining_amount": fee.get("remaining_amount", total - paid),
+        "paid_percentage": round(paid / total * 100, 1) if total else 100.0
+    }
+
+
+async def _with_students(rows) -> List[Dict]:
+    """Add name, email and student id to each row with one users query for the whole batch"""
+    db = await get_database()
+    rows = list(rows)
+    ids = [ObjectId(row["user_id"]) for row in rows if ObjectId.is_valid(row["user_id"])]
+    users = {}
+    async for user in db.users.find({"_id": {"$in": ids}}, {"full_name": 1, "email": 1, "student_id": 1}):
+        users[str(user["_id"])] = user
+    for row in rows:
+        user = users.get(row["user_id"], {})
+        row["student_name"] = user.get("full_name")
+        row["student_email"] = user.get("email")
+        row["student_id"] = user.get("student_id")
+    return rows
+
+
+async def _batched(cursor, to_row) -> AsyncIterator[Dict]:
+    batch = []
+    async for doc in cursor:
+        batch.append(to_row(doc))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            for row in await _with_students(batch):
+                yield row
+            batch = []
+    if batch:
+        for row in await _with_students(batch):
+            yield row
+
+
+async def iter_collections(start: datetime, end: datetime) -> AsyncIterator[Dict]:
+    """Every payment in [start, end), oldest first, one batch in memory at a time"""
+    db = await get_database()
+    cursor = db.fee_transactions.find(
+        {"created_at": {"$gte": start, "$lt": end}},
+        {"_id": 0, "idempotency_key": 0, "id": 0}
+    ).sort([("created_at", 1), ("_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    async for row in _batched(cursor, dict):
+        yield row
+
+
+async def iter_fees(outstanding_only: bool = False, below_threshold: float = None) -> AsyncIterator[Dict]:
+    """Every student's fee position, optionally only those owing or below a paid percentage"""
+    db = await get_database()
+    query = {}
+    if outstanding_only:
+        query["remaining_amount"] = {"$gt": 0}
+    if below_threshold is not None:
+        query.update(_below(below_threshold))
+    cursor = db.fees.find(
+        query,
+        {"user_id": 1, "total_amount": 1, "paid_amount": 1, "remaining_amount": 1}
+    ).batch_size(EXPORT_BATCH_SIZE)
+    async for row in _batched(cursor, _fee_row):
+        yield row
@@ -0,0 +1,186 @@
+"""Batch hostel allocation: pending applications, oldest first, against each hostel's free beds"""
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import Dict, List
+from pymongo import UpdateOne
+from app.database.mongo import get_database
+from app.models.hostel import HostelStatus
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.onboarding_service import refresh_onboarding_states
+from app.services.outbox import enqueue_notifications
+from app.services.hostel_rooms import assign_bed, availability_cache, hostel_availability, release_bed
+
+ALLOCATION_BATCH_SIZE = 1000
+PREFERENCE_FIELDS = ["preference_1", "preference_2", "preference_3"]
+
+
+async def _plan(db) -> Dict:
+    """Walk every pending application once, giving each its first preference that still has a free bed"""
+    availability = await hostel_availability(use_cache=False)
+    hostels = await db.hostels.distinct("name")
+    free = {name: availability.get(name, {}).get("free_beds", 0) for name in hostels}
+    available_before = dict(free)
+    assignments, unassigned = [], []
+
+    async for application in db.hostel_applications.find(
+        {"status": HostelStatus.PENDING.value},
+        {"user_id": 1, "preferences": 1}
+    ).sort([("applied_at", 1), ("_id", 1)]).batch_size(ALLOCATION_BATCH_SIZE):
+        preferences = application.get("preferences") or {}
+        for rank, field in enumerate(PREFERENCE_FIELDS, start=1):
+            name = preferences.get(field)
+            if name and free.get(name, 0) > 0:
+                free[name] -= 1
+                assignments.append({
+                    "application_id": application["_id"], "user_id": application["user_id"],
+                    "hostel": name, "preference": rank
+                })
+                break
+        else:
+            unassigned.append({"application_id": application["_id"], "user_id": application["user_id"]})
+    return {"available_before": available_before, "assignments": assignments, "unassigned": unassigned}
+
+
+def _summary(plan: Dict, assignments: List[Dict]) -> Dict:
+    per_hostel = {name: 0 for name in plan["available_before"]}
+    for assignment in assignments:
+        per_hostel[assignment["hostel"]] += 1
+    return {
+        "pending": len(plan["assignments"]) + len(plan["unassigned"]),
+        "allocated": len(assignments),
+        "unassigned": len(plan["unassigned"]) + len(plan["assignments"]) - len(assignments),
+        "hostels": [
+            {
+                "hostel": name,
+                "available_before": available,
+                "allocated": per_hostel[name],
+                "available_after": available - per_hostel[name]
+            }
+            for name, available in plan["available_before"].items()
+        ]
+    }
+
+
+async def _claim_beds(db, planned: List[Dict]) -> List[Dict]:
+    """Fill the first free beds of each hostel with one compare-and-set bulk_write over hostel_rooms"""
+    by_hostel: Dict[str, List[Dict]] = {}
+    for assignment in planned:
+        by_hostel.setdefault(assignment["hostel"], []).append(assignment)
+
+    operations, claimed = [], []
+    for hostel, group in by_hostel.items():
+        rooms = await db.hostel_rooms.find(
+            {"hostel": hostel, "free_beds": {"$gt": 0}},
+            {"room_number": 1, "free_beds": 1}
+        ).sort("room_number", 1).limit(len(group)).to_list(length=None)
+        waiting = iter(group)
+        for room in rooms:
+            takers = list(islice(waiting, room["free_beds"]))
+            if not takers:
+                break
+            operations.append(UpdateOne(
+                # Only applies if nobody took a bed in this room since we read it
+                {"_id": room["_id"], "free_beds": room["free_beds"]},
+                {"$inc": {"free_beds": -len(takers)}, "$push": {"occupants": {"$each": [t["user_id"] for t in takers]}}}
+            ))
+            claimed.extend({**taker, "room": room["room_number"]} for taker in takers)
+    if not operations:
+        return []
+
+    result = await db.hostel_rooms.bulk_write(operations, ordered=False)
+    availability_cache.clear()
+    if result.modified_count == len(operations):
+        return claimed
+
+    # Some rooms changed under us: keep the beds that were taken and claim the rest one at a time
+    landed = {}
+    async for room in db.hostel_rooms.find(
+        {"occupants": {"$in": [assignment["user_id"] for assignment in claimed]}},
+        {"room_number": 1, "occupants": 1}
+    ):
+        for user_id in room["occupants"]:
+            landed[user_id] = room["room_number"]
+    placed = []
+    for assignment in claimed:
+        room = landed.get(assignment["user_id"]) or await assign_bed(assignment["hostel"], assignment["user_id"])
+        if room is not None:
+            placed.append({**assignment, "room": room})
+    return placed
+
+
+async def _allocate_batch(db, planned: List[Dict], run_id: str, now: datetime) -> List[Dict]:
+    """Claim a bed for each planned assignment, then record the allocations with one bulk_write"""
+    # When a hostel filled up since the plan was read, those applicants stay pending for the next run
+    placed = await _claim_beds(db, planned)
+    if not placed:
+        return []
+
+    result = await db.hostel_applications.bulk_write(
+        [
+            UpdateOne(
+                # Skips applications allocated, rejected or withdrawn since the plan was read
+                {"_id": assignment["application_id"], "status": HostelStatus.PENDING.value},
+                {"$set": {
+                    "status": HostelStatus.ALLOCATED.value,
+                    "allocated_hostel": assignment["hostel"],
+                    "allocated_room": assignment["room"],
+                    "allocated_at": now,
+                    "allocation_run": run_id
+                }}
+            )
+            for assignment in placed
+        ],
+        ordered=False
+    )
+    if result.modified_count == len(placed):
+        return placed
+
+    # Some applications changed under us: keep what was written and free the other beds
+    written = set()
+    async for application in db.hostel_applications.find(
+        {"_id": {"$in": [assignment["application_id"] for assignment in placed]}, "allocation_run": run_id},
+        {"_id": 1}
+    ):
+        written.add(application["_id"])
+    for assignment in placed:
+        if assignment["application_id"] not in written:
+            await release_bed(assignment["hostel"], assignment["room"], assignment["user_id"])
+    return [assignment for assignment in placed if assignment["application_id"] in written]
+
+
+async def allocate_pending_applications(dry_run: bool = False) -> Dict:
+    """Allocate every pending application in one pass; with dry_run, only return the plan"""
+    db = await get_database()
+    plan = await _plan(db)
+    if dry_run:
+        report = _summary(plan, plan["assignments"])
+        report["dry_run"] = True
+        report["assignments"] = [
+            {**assignment, "application_id": str(assignment["application_id"])}
+            for assignment in plan["assignments"]
+        ]
+        return report
+
+    run_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    allocated = []
+    for start in range(0, len(plan["assignments"]), ALLOCATION_BATCH_SIZE):
+        batch = await _allocate_batch(db, plan["assignments"][start:start + ALLOCATION_BATCH_SIZE], run_id, now)
+        allocated.extend(batch)
+        await refresh_onboarding_states([assignment["user_id"] for assignment in batch])
+        await enqueue_notifications([
+            NotificationCreate(
+                user_id=assignment["user_id"],
+                title="Hostel Allocated",
+                message=f"Your hostel application has been approved. Hostel: {assignment['hostel']}, Room: {assignment['room']}",
+                notification_type=NotificationType.TASK_COMPLETION,
+                link="/hostel"
+            )
+            for assignment in batch
+        ])
+
+    report = _summary(plan, allocated)
+    report["dry_run"] = False
+    report["run_id"] = run_id
+    return report
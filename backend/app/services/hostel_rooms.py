@@ -0,0 +1,134 @@
+"""Room-level hostel inventory (the hostel_rooms collection): beds, occupants and free-bed counts"""
+import os
+from datetime import datetime
+from typing import Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.database.mongo import get_database
+from app.models.hostel import HostelStatus
+from app.utils.cache import TTLCache
+
+DEFAULT_BEDS_PER_ROOM = 2
+DUPLICATE_KEY_ERROR = 11000
+# Free-bed totals are cached briefly; assignments in this worker drop the cache straight away
+AVAILABILITY_TTL_SECONDS = float(os.getenv("HOSTEL_AVAILABILITY_TTL_SECONDS", "30"))
+availability_cache = TTLCache(1, AVAILABILITY_TTL_SECONDS)
+
+
+def room_number(index: int) -> str:
+    return f"{index + 1:03d}"
+
+
+async def create_rooms(hostel: str, beds: int, beds_per_room: int = DEFAULT_BEDS_PER_ROOM) -> int:
+    """Create enough rooms to hold `beds` beds; rooms that already exist are left alone. Returns rooms created"""
+    db = await get_database()
+    now = datetime.utcnow()
+    rooms = []
+    for index in range(-(-beds // beds_per_room)):
+        size = min(beds_per_room, beds - index * beds_per_room)
+        rooms.append({
+            "hostel": hostel,
+            "room_number": room_number(index),
+            "capacity": size,
+            "free_beds": size,
+            "occupants": [],
+            "created_at": now
+        })
+    if not rooms:
+        return 0
+    try:
+        result = await db.hostel_rooms.insert_many(rooms, ordered=False)
+        created = len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+            raise
+        created = e.details.get("nInserted", 0)
+    availability_cache.clear()
+    return created
+
+
+async def assign_bed(hostel: str, user_id: str, room: Optional[str] = None) -> Optional[str]:
+    """Put a student in the first room (or the given room) of a hostel with a free bed; returns the room number"""
+    db = await get_database()
+    query = {"hostel": hostel, "free_beds": {"$gt": 0}, "occupants": {"$ne": user_id}}
+    if room is not None:
+        query["room_number"] = room
+    # Check and claim in one document update, so two allocations can't both take the last bed
+    assigned = await db.hostel_rooms.find_one_and_update(
+        query,
+        {"$inc": {"free_beds": -1}, "$push": {"occupants": user_id}},
+        sort=[("room_number", 1)],
+        projection={"room_number": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    availability_cache.clear()
+    return assigned["room_number"] if assigned else None
+
+
+async def release_bed(hostel: str, room: str, user_id: str) -> bool:
+    """Take a student out of a room; False if they weren't in it"""
+    db = await get_database()
+    result = await db.hostel_rooms.update_one(
+        {"hostel": hostel, "room_number": room, "occupants": user_id},
+        {"$pull": {"occupants": user_id}, "$inc": {"free_beds": 1}}
+    )
+    availability_cache.clear()
+    return result.modified_count > 0
+
+
+async def hostel_availability(use_cache: bool = True) -> Dict[str, Dict]:
+    """Rooms, beds and free beds per hostel, from one aggregate over hostel_rooms"""
+    if use_cache:
+        cached = availability_cache.get("hostels")
+        if cached is not None:
+            return cached
+    db = await get_database()
+    availability = {}
+    async for row in db.hostel_rooms.aggregate([
+        {"$group": {
+            "_id": "$hostel",
+            "rooms": {"$sum": 1},
+            "beds": {"$sum": "$capacity"},
+            "free_beds": {"$sum": "$free_beds"},
+            "rooms_with_free_beds": {"$sum": {"$cond": [{"$gt": ["$free_beds", 0]}, 1, 0]}}
+        }}
+    ]):
+        availability[row.pop("_id")] = row
+    availability_cache.set("hostels", availability)
+    return availability
+
+
+async def seed_rooms() -> Dict[str, int]:
+    """Create rooms for every hostel that has none yet, sized from the hostel's capacity"""
+    db = await get_database()
+    with_rooms = set(await db.hostel_rooms.distinct("hostel"))
+    created = {}
+    async for hostel in db.hostels.find({}, {"name": 1, "capacity": 1, "beds_per_room": 1}):
+        if hostel["name"] not in with_rooms and hostel.get("capacity"):
+            created[hostel["name"]] = await create_rooms(
+                hostel["name"], hostel["capacity"], hostel.get("beds_per_room") or DEFAULT_BEDS_PER_ROOM
+            )
+    return created
+
+
+async def place_allocated_students() -> Dict[str, int]:
+    """Give every allocated student without a bed one in their hostel, and record the room on the application"""
+    db = await get_database()
+    report = {"placed": 0, "no_free_bed": 0}
+    placed = set()
+    async for room in db.hostel_rooms.find({"occupants.0": {"$exists": True}}, {"occupants": 1}):
+        placed.update(room["occupants"])
+    async for application in db.hostel_applications.find(
+        {"status": HostelStatus.ALLOCATED.value, "allocated_hostel": {"$ne": None}},
+        {"user_id": 1, "allocated_hostel": 1}
+    ).sort("allocated_at", 1):
+        if application["user_id"] in placed:
+            continue
+        room = await assign_bed(application["allocated_hostel"], application["user_id"])
+        if room is None:
+            report["no_free_bed"] += 1
+            continue
+        await db.hostel_applications.update_one({"_id": application["_id"]}, {"$set": {"allocated_room": room}})
+        report["placed"] += 1
+    return report
+
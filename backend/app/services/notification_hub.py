@@ -0,0 +1,92 @@
+"""In-process fan-out of notification events to open stream connections"""
+import asyncio
+import os
+from typing import Dict, Optional, Set
+
+STREAM_MAX_CONNECTIONS_PER_USER = int(os.getenv("NOTIFICATION_STREAM_MAX_PER_USER", "5"))
+STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class Subscription:
+    """One open stream; events queue up here until the connection writes them out"""
+
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def offer(self, event: Dict) -> bool:
+        """Queue an event; a consumer that falls a full queue behind is closed instead of blocking publishers"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+
+    def close(self) -> None:
+        # Replace whatever is pending with the end-of-stream marker; the client reconnects and refetches
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def next_event(self, timeout: float) -> Optional[Dict]:
+        """Next event, None at end of stream; raises asyncio.TimeoutError when idle for `timeout`"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class NotificationHub:
+    """Subscriptions keyed by user_id. Only reaches streams connected to this worker process."""
+
+    def __init__(self, max_connections_per_user: int, queue_size: int):
+        self.max_connections_per_user = max_connections_per_user
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscribers = self._subscribers.setdefault(user_id, set())
+        if len(subscribers) >= self.max_connections_per_user:
+            raise TooManyConnections(user_id)
+        subscription = Subscription(user_id, self.queue_size)
+        subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_id: str) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: str, event: str, data: Dict) -> None:
+        for subscription in list(self._subscribers.get(user_id, ())):
+            if subscription.offer({"event": event, "data": data}):
+                self.published += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(subs) for subs in self._subscribers.values()),
+            "max_connections_per_user": self.max_connections_per_user,
+            "published": self.published,
+            "dropped": self.dropped
+        }
+
+
+notification_hub = NotificationHub(STREAM_MAX_CONNECTIONS_PER_USER, STREAM_QUEUE_SIZE)
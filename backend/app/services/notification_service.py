@@ -1,13 +1,30 @@
+from collections import Counter
 from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from app.database.mongo import get_database
 from app.models.notification import NotificationCreate
 from app.utils.mongo import mongo_to_dict
+from app.utils.pagination import encode_cursor, keyset_filter, clamp_page_size
+from app.services.notification_hub import notification_hub
 from bson import ObjectId
 
-async def create_notification(notification_data: NotificationCreate):
-    """Create a new notification"""
-    db = await get_database()
-    notification = {
+# Fields the notification drawer renders (plus created_at for the cursor)
+NOTIFICATION_LIST_PROJECTION = {
+    "title": 1,
+    "message": 1,
+    "notification_type": 1,
+    "link": 1,
+    "is_read": 1,
+    "created_at": 1
+}
+
+BULK_CHUNK_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+
+def _notification_document(notification_data: NotificationCreate) -> Dict:
+    return {
         "user_id": notification_data.user_id,
         "title": notification_data.title,
         "message": notification_data.message,
@@ -16,37 +33,194 @@ async def create_notification(notification_data: NotificationCreate):
         "is_read": False,
         "created_at": datetime.utcnow()
     }
+
+async def create_notification(notification_data: NotificationCreate):
+    """Create a new notification"""
+    db = await get_database()
+    notification = _notification_document(notification_data)
     result = await db.notifications.insert_one(notification)
     notification["_id"] = result.inserted_id
-    return mongo_to_dict(notification)
+    created = mongo_to_dict(notification)
+    notification_hub.publish(notification_data.user_id, "notification", created)
+    await _adjust_unread(db, notification_data.user_id, 1)
+    return created
+
+async def _adjust_unread(db, user_id: str, delta: int):
+    # Per-user unread counters make the unread-count poll a single point read
+    before = await db.notification_counters.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"unread": delta}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        # The counter didn't exist, so it starts at delta; seed it from the notifications instead
+        await _seed_counters(db, [user_id])
+        if notification_hub.has_subscribers(user_id):
+            counter = await db.notification_counters.find_one({"_id": user_id})
+            notification_hub.publish(user_id, "unread_count", {"count": max(0, counter["unread"])})
+        return
+    notification_hub.publish(user_id, "unread_count", {"count": max(0, before["unread"] + delta)})
+
+async def _seed_counters(db, user_ids: List[str]):
+    """Set freshly created counters to the users' real unread counts"""
+    actual = {user_id: 0 for user_id in user_ids}
+    async for row in db.notifications.aggregate([
+        {"$match": {"user_id": {"$in": user_ids}, "is_read": False}},
+        {"$group": {"_id": "$user_id", "unread": {"$sum": 1}}}
+    ]):
+        actual[row["_id"]] = row["unread"]
+    await db.notification_counters.bulk_write([
+        UpdateOne({"_id": user_id}, {"$set": {"unread": unread}})
+        for user_id, unread in actual.items()
+    ], ordered=False)
+
+async def create_notifications_bulk(
+    notifications: List[NotificationCreate],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_progress: Optional[Callable[[int], Awaitable]] = None,
+    event_ids: Optional[List[str]] = None
+) -> int:
+    """Insert many notifications in unordered chunks; returns how many were created"""
+    db = await get_database()
+    created = 0
+    for start in range(0, len(notifications), chunk_size):
+        documents = [_notification_document(n) for n in notifications[start:start + chunk_size]]
+        if event_ids is not None:
+            # One per notification; an event that was already delivered is skipped, so a retry is a no-op
+            for document, event_id in zip(documents, event_ids[start:start + chunk_size]):
+                document["event_id"] = event_id
+        try:
+            await db.notifications.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            skipped = {error["index"] for error in errors}
+            documents = [document for index, document in enumerate(documents) if index not in skipped]
+        created += len(documents)
+        if not documents:
+            continue
+        
+        per_user = Counter(doc["user_id"] for doc in documents)
+        users = list(per_user)
+        counters = await db.notification_counters.bulk_write([
+            UpdateOne({"_id": user_id}, {"$inc": {"unread": per_user[user_id]}}, upsert=True)
+            for user_id in users
+        ], ordered=False)
+        if counters.upserted_ids:
+            await _seed_counters(db, [users[index] for index in counters.upserted_ids])
+        await _publish_bulk(db, documents, per_user)
+        
+        if on_progress is not None:
+            await on_progress(created)
+    return created
+
+async def _publish_bulk(db, documents: List[Dict], per_user: Counter):
+    # Only users with an open stream on this worker need the events
+    streaming = [user_id for user_id in per_user if notification_hub.has_subscribers(user_id)]
+    if not streaming:
+        return
+    for doc in documents:
+        if notification_hub.has_subscribers(doc["user_id"]):
+            notification_hub.publish(doc["user_id"], "notification", mongo_to_dict(doc))
+    async for counter in db.notification_counters.find({"_id": {"$in": streaming}}):
+        notification_hub.publish(counter["_id"], "unread_count", {"count": max(0, counter["unread"])})
 
-async def get_user_notifications(user_id: str, unread_only: bool = False):
-    """Get notifications for a user"""
+async def get_user_notifications(
+    user_id: str,
+    unread_only: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Dict:
+    """Get one page of a user's notifications, newest first"""
     db = await get_database()
+    page_size = clamp_page_size(limit)
     query = {"user_id": user_id}
     if unread_only:
         query["is_read"] = False
+    query.update(keyset_filter("created_at", cursor))
     
-    cursor = db.notifications.find(query).sort("created_at", -1)
-    notifications = []
-    async for doc in cursor:
-        notifications.append(mongo_to_dict(doc))
-    return notifications
+    docs = await db.notifications.find(query, NOTIFICATION_LIST_PROJECTION).sort(
+        [("created_at", -1), ("_id", -1)]
+    ).limit(page_size + 1).to_list(length=page_size + 1)
+    
+    next_cursor = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+    
+    return {
+        "notifications": [mongo_to_dict(doc) for doc in docs],
+        "next_cursor": next_cursor
+    }
 
 async def mark_notification_read(notification_id: str, user_id: str):
     """Mark a notification as read"""
     db = await get_database()
-    await db.notifications.update_one(
-        {"_id": ObjectId(notification_id), "user_id": user_id},
+    result = await db.notifications.update_one(
+        {"_id": ObjectId(notification_id), "user_id": user_id, "is_read": False},
         {"$set": {"is_read": True}}
     )
+    if result.modified_count:
+        await _adjust_unread(db, user_id, -1)
     return {"message": "Notification marked as read"}
 
+async def mark_all_notifications_read(user_id: str):
+    """Mark every unread notification of a user as read"""
+    db = await get_database()
+    result = await db.notifications.update_many(
+        {"user_id": user_id, "is_read": False},
+        {"$set": {"is_read": True}}
+    )
+    # Decrement by what was actually flipped so notifications created meanwhile stay counted
+    if result.modified_count:
+        await _adjust_unread(db, user_id, -result.modified_count)
+    return {"message": "All notifications marked as read", "updated": result.modified_count}
+
 async def get_unread_count(user_id: str) -> int:
     """Get count of unread notifications"""
     db = await get_database()
+    counter = await db.notification_counters.find_one({"_id": user_id})
+    if counter is not None:
+        return max(0, counter.get("unread", 0))
+    
+    # First read for this user: seed the counter from the notifications themselves
     count = await db.notifications.count_documents({
         "user_id": user_id,
         "is_read": False
     })
+    await db.notification_counters.update_one(
+        {"_id": user_id},
+        {"$setOnInsert": {"unread": count}},
+        upsert=True
+    )
     return count
+
+async def reconcile_unread_counters(batch_size: int = 1000) -> int:
+    """Correct counters that drifted from the real unread counts; returns how many were fixed"""
+    db = await get_database()
+    
+    # Snapshot counters before counting so any write in between changes the counter
+    # and the conditional update below skips it instead of clobbering it
+    observed = {}
+    async for counter in db.notification_counters.find({}):
+        observed[counter["_id"]] = counter.get("unread", 0)
+    
+    actual = {}
+    async for row in db.notifications.aggregate([
+        {"$match": {"is_read": False}},
+        {"$group": {"_id": "$user_id", "unread": {"$sum": 1}}}
+    ], allowDiskUse=True):
+        actual[row["_id"]] = row["unread"]
+    
+    fixes = [
+        UpdateOne({"_id": user_id, "unread": value}, {"$set": {"unread": actual.get(user_id, 0)}})
+        for user_id, value in observed.items()
+        if value != actual.get(user_id, 0)
+    ]
+    fixed = 0
+    for start in range(0, len(fixes), batch_size):
+        result = await db.notification_counters.bulk_write(fixes[start:start + batch_size], ordered=False)
+        fixed += result.modified_count
+    return fixed
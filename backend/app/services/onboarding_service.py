@@ -0,0 +1,192 @@
+"""Materialized per-student onboarding snapshots (the onboarding_state collection)"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import Depends
+from pymongo import ReplaceOne
+from app.database.mongo import get_database
+from app.utils.auth import get_current_user
+from app.utils.onboarding import (
+    calculate_completion_many, detect_risk_many, completion_from_records, fee_paid_percentage,
+    risk_from_status, health_score_from_completion, next_best_action_from_completion
+)
+
+SNAPSHOT_FIELDS = ["completion", "health_score", "risk", "next_best_action"]
+
+class OnboardingContext:
+    """A student's onboarding records for one request; each collection is read at most once"""
+    
+    def __init__(self, user_id: str, user: Optional[Dict] = None):
+        self.user_id = user_id
+        self.user = user
+        self._loaded: Dict[str, Any] = {}
+    
+    async def _once(self, key: str, load):
+        if key not in self._loaded:
+            self._loaded[key] = await load()
+        return self._loaded[key]
+    
+    async def fee(self) -> Optional[Dict]:
+        db = await get_database()
+        return await self._once("fee", lambda: db.fees.find_one({"user_id": self.user_id}))
+    
+    async def documents(self) -> List[Dict]:
+        db = await get_database()
+        return await self._once("documents", lambda: db.documents.find(
+            {"user_id": self.user_id},
+            {"_id": 0, "document_type": 1, "status": 1}
+        ).to_list(length=None))
+    
+    async def verified_documents(self) -> int:
+        return sum(1 for doc in await self.documents() if doc.get("status") == "verified")
+    
+    async def pending_documents(self) -> int:
+        return sum(1 for doc in await self.documents() if doc.get("status") in ["pending", "uploaded"])
+    
+    async def registered_courses(self) -> int:
+        db = await get_database()
+        return await self._once(
+            "registered_courses",
+            lambda: db.student_courses.count_documents({"user_id": self.user_id})
+        )
+    
+    async def hostel_application(self) -> Optional[Dict]:
+        db = await get_database()
+        return await self._once(
+            "hostel_application",
+            lambda: db.hostel_applications.find_one({"user_id": self.user_id})
+        )
+    
+    async def compute_state(self) -> Dict:
+        """Derive the onboarding state from the source records"""
+        completion = completion_from_records(
+            await self.verified_documents(),
+            await self.fee(),
+            await self.registered_courses(),
+            await self.hostel_application()
+        )
+        risk = risk_from_status(fee_paid_percentage(await self.fee()), await self.pending_documents())
+        return _state_from(completion, risk)
+    
+    async def state(self) -> Dict:
+        """The stored snapshot, built on first access"""
+        if "state" not in self._loaded:
+            db = await get_database()
+            snapshot = await db.onboarding_state.find_one({"_id": self.user_id})
+            if snapshot is None:
+                return await self.refresh()
+            self._loaded["state"] = {field: snapshot[field] for field in SNAPSHOT_FIELDS}
+        return self._loaded["state"]
+    
+    async def refresh(self, changed: Optional[List[str]] = None) -> Dict:
+        """Reload the source records (or only the `changed` ones), recompute and store the snapshot"""
+        db = await get_database()
+        if changed is None:
+            self._loaded.clear()
+        else:
+            for key in [*changed, "state"]:
+                self._loaded.pop(key, None)
+        state = await self.compute_state()
+        await db.onboarding_state.replace_one(
+            {"_id": self.user_id},
+            _snapshot_document(self.user_id, state),
+            upsert=True
+        )
+        self._loaded["state"] = state
+        return state
+    
+    async def completion(self) -> Dict:
+        return (await self.state())["completion"]
+    
+    async def health_score(self) -> int:
+        return (await self.state())["health_score"]
+    
+    async def risk(self) -> Dict:
+        return (await self.state())["risk"]
+    
+    async def next_best_action(self) -> Dict:
+        return (await self.state())["next_best_action"]
+
+async def get_onboarding_context(current_user: dict = Depends(get_current_user)) -> OnboardingContext:
+    """FastAPI dependency giving each request one OnboardingContext for the current user"""
+    return OnboardingContext(current_user["id"], user=current_user)
+
+async def compute_onboarding_state(user_id: str) -> Dict:
+    """Recompute a student's onboarding state from the source collections"""
+    return await OnboardingContext(user_id).compute_state()
+
+async def compute_onboarding_states_many(user_ids: List[str]) -> Dict[str, Dict]:
+    """compute_onboarding_state for a batch of students, keyed by user id"""
+    completions = await calculate_completion_many(user_ids)
+    risks = await detect_risk_many(user_ids)
+    return {user_id: _state_from(completions[user_id], risks[user_id]) for user_id in user_ids}
+
+def _state_from(completion: Dict, risk: Dict) -> Dict:
+    return {
+        "completion": completion,
+        "health_score": health_score_from_completion(completion),
+        "risk": risk,
+        "next_best_action": next_best_action_from_completion(completion)
+    }
+
+def _snapshot_document(user_id: str, state: Dict) -> Dict:
+    # Snapshots are keyed by user id so reads are a single _id lookup
+    return {"_id": user_id, **state, "updated_at": datetime.utcnow()}
+
+async def refresh_onboarding_state(user_id: str) -> Dict:
+    """Recompute and store the snapshot; call after any write that affects onboarding"""
+    return await OnboardingContext(user_id).refresh()
+
+async def refresh_onboarding_states(user_ids: List[str]) -> None:
+    """refresh_onboarding_state for a batch of students, in a fixed number of queries"""
+    if user_ids:
+        await _write_snapshots(await compute_onboarding_states_many(user_ids))
+
+async def _write_snapshots(states: Dict[str, Dict]) -> None:
+    db = await get_database()
+    await db.onboarding_state.bulk_write([
+        ReplaceOne({"_id": user_id}, _snapshot_document(user_id, state), upsert=True)
+        for user_id, state in states.items()
+    ], ordered=False)
+
+async def get_onboarding_state(user_id: str) -> Dict:
+    """Read the stored snapshot, building it on first access"""
+    return await OnboardingContext(user_id).state()
+
+async def _student_ids(batch_size: int):
+    db = await get_database()
+    batch = []
+    async for user in db.users.find({"role": "student"}, {"_id": 1}):
+        batch.append(str(user["_id"]))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def rebuild_onboarding_states(batch_size: int = 500) -> int:
+    """Recompute every student's snapshot; returns the number written"""
+    written = 0
+    async for user_ids in _student_ids(batch_size):
+        await _write_snapshots(await compute_onboarding_states_many(user_ids))
+        written += len(user_ids)
+    return written
+
+async def check_onboarding_states(batch_size: int = 500) -> List[Dict]:
+    """Compare stored snapshots against a full recompute and list every mismatch"""
+    db = await get_database()
+    mismatches = []
+    async for user_ids in _student_ids(batch_size):
+        stored = {}
+        async for snapshot in db.onboarding_state.find({"_id": {"$in": user_ids}}):
+            stored[snapshot["_id"]] = snapshot
+
+        states = await compute_onboarding_states_many(user_ids)
+        for user_id, expected in states.items():
+            snapshot = stored.get(user_id)
+            if snapshot is None:
+                mismatches.append({"user_id": user_id, "fields": ["missing"]})
+                continue
+            fields = [field for field in SNAPSHOT_FIELDS if snapshot.get(field) != expected[field]]
+            if fields:
+                mismatches.append({"user_id": user_id, "fields": fields})
+    return mismatches
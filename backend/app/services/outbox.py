@@ -0,0 +1,233 @@
+"""Outbox for request side-effects, drained in batches by a background worker"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.database.mongo import get_database
+from app.models.notification import NotificationCreate
+from app.services.notification_service import create_notifications_bulk
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_LEASE_SECONDS = 30
+
+# A single worker across all processes drains the outbox, which keeps each user's events in order
+_worker_id = uuid.uuid4().hex
+
+_metrics = {
+    "processed": 0,
+    "retried": 0,
+    "failed": 0,
+    "batches": 0,
+    "last_batch_seconds": None,
+    "last_batch_at": None,
+}
+
+
+async def enqueue(event_type: str, user_id: str, payload: Dict, session=None) -> None:
+    """Record a side-effect; pass the request's session to commit it with the main write"""
+    await enqueue_many([(event_type, user_id, payload)], session=session)
+
+
+async def enqueue_many(events: List[tuple], session=None) -> None:
+    """Record (event_type, user_id, payload) side-effects in one insert"""
+    if not events:
+        return
+    if session is None:
+        # Not part of the caller's write: that write has already happened, so losing the side-effect
+        # is better than failing the request that made it
+        try:
+            await _insert_events(events)
+        except Exception as e:
+            print(f"WARNING: could not enqueue {len(events)} outbox event(s): {e}")
+        return
+    await _insert_events(events, session=session)
+
+
+async def _insert_events(events: List[tuple], session=None) -> None:
+    db = await get_database()
+    now = datetime.utcnow()
+    await db.outbox.insert_many([
+        {
+            "event_type": event_type,
+            "user_id": user_id,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+            "last_error": None,
+        }
+        for event_type, user_id, payload in events
+    ], ordered=True, session=session)
+
+
+async def enqueue_notification(notification: NotificationCreate, session=None) -> None:
+    await enqueue("notification", notification.user_id, notification.model_dump(mode="json"), session=session)
+
+
+async def enqueue_notifications(notifications: List[NotificationCreate], session=None) -> None:
+    await enqueue_many(
+        [("notification", n.user_id, n.model_dump(mode="json")) for n in notifications],
+        session=session
+    )
+
+
+async def _deliver_notifications(events: List[Dict]) -> None:
+    # Keyed by outbox event, so retrying a batch that partly went through doesn't notify twice
+    await create_notifications_bulk(
+        [NotificationCreate(**event["payload"]) for event in events],
+        event_ids=[str(event["_id"]) for event in events]
+    )
+
+
+# event_type -> handler taking every claimed event of that type, in order
+HANDLERS: Dict[str, Callable[[List[Dict]], Awaitable[None]]] = {
+    "notification": _deliver_notifications,
+}
+
+
+async def _hold_lease(db) -> bool:
+    now = datetime.utcnow()
+    try:
+        lease = await db.outbox_leases.find_one_and_update(
+            {"_id": "outbox-worker", "$or": [{"owner": _worker_id}, {"until": {"$lt": now}}]},
+            {"$set": {"owner": _worker_id, "until": now + timedelta(seconds=OUTBOX_LEASE_SECONDS)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Another worker holds a live lease (the upsert collided with its document)
+        return False
+    return lease is not None and lease.get("owner") == _worker_id
+
+
+async def drain_outbox_once(batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Deliver the oldest pending events; returns how many were handled"""
+    db = await get_database()
+    started = time.perf_counter()
+    now = datetime.utcnow()
+
+    # An event waiting to retry holds back its user's later events so delivery stays in order,
+    # without holding back anyone else's
+    blocked = await db.outbox.distinct("user_id", {"status": "pending", "available_at": {"$gt": now}})
+    events = await db.outbox.find({
+        "status": "pending",
+        "available_at": {"$lte": now},
+        "user_id": {"$nin": blocked}
+    }).sort([("created_at", 1), ("_id", 1)]).limit(batch_size).to_list(length=batch_size)
+
+    ready: Dict[str, List[Dict]] = {}
+    for event in events:
+        ready.setdefault(event["event_type"], []).append(event)
+
+    updates = []
+    # Users with an event that failed in this pass; their later events stay pending behind it
+    stalled = set()
+    for event_type, batch in ready.items():
+        batch = [event for event in batch if event["user_id"] not in stalled]
+        handler = HANDLERS.get(event_type)
+        if handler is None:
+            error = ValueError(f"No outbox handler for {event_type}")
+            updates.extend(_retry_later(event, error, now) for event in batch)
+            stalled.update(event["user_id"] for event in batch)
+            continue
+        try:
+            await handler(batch)
+            delivered = batch
+        except Exception:
+            # Something in the batch is bad; find it by delivering one event at a time so only it backs off
+            delivered = await _deliver_one_by_one(handler, batch, updates, stalled, now)
+        _metrics["processed"] += len(delivered)
+        updates.extend(
+            UpdateOne({"_id": event["_id"]}, {"$set": {"status": "done", "processed_at": now}})
+            for event in delivered
+        )
+
+    if updates:
+        await db.outbox.bulk_write(updates, ordered=False)
+    _metrics["batches"] += 1
+    _metrics["last_batch_seconds"] = round(time.perf_counter() - started, 4)
+    _metrics["last_batch_at"] = now
+    return len(updates)
+
+
+def _retry_later(event: Dict, error: Exception, now: datetime) -> UpdateOne:
+    attempts = event["attempts"] + 1
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        _metrics["failed"] += 1
+        change = {"status": "failed", "attempts": attempts, "last_error": str(error)}
+    else:
+        _metrics["retried"] += 1
+        backoff = timedelta(seconds=min(300, 2 ** attempts))
+        change = {"attempts": attempts, "available_at": now + backoff, "last_error": str(error)}
+    return UpdateOne({"_id": event["_id"]}, {"$set": change})
+
+
+async def _deliver_one_by_one(
+    handler, batch: List[Dict], updates: List[UpdateOne], stalled: set, now: datetime
+) -> List[Dict]:
+    """Retry a failed batch event by event; returns the delivered ones and queues a backoff for each failure"""
+    delivered = []
+    for event in batch:
+        # A user's later events wait (still pending) behind their failed one, so order is kept
+        if event["user_id"] in stalled:
+            continue
+        try:
+            await handler([event])
+        except Exception as e:
+            stalled.add(event["user_id"])
+            updates.append(_retry_later(event, e, now))
+            continue
+        delivered.append(event)
+    return delivered
+
+
+async def run_outbox_worker(poll_seconds: float = OUTBOX_POLL_SECONDS) -> None:
+    """Drain the outbox until cancelled, while this process holds the worker lease"""
+    db = await get_database()
+    try:
+        await _drain_forever(db, poll_seconds)
+    finally:
+        # Hand the lease over right away instead of letting another process wait for it to expire
+        await db.outbox_leases.update_one(
+            {"_id": "outbox-worker", "owner": _worker_id},
+            {"$set": {"until": datetime.utcnow()}}
+        )
+
+
+async def _drain_forever(db, poll_seconds: float) -> None:
+    while True:
+        try:
+            handled = 0
+            if await _hold_lease(db):
+                handled = await drain_outbox_once()
+            if handled < OUTBOX_BATCH_SIZE:
+                await asyncio.sleep(poll_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"WARNING: outbox worker error: {e}")
+            await asyncio.sleep(poll_seconds)
+
+
+async def outbox_stats() -> Dict:
+    """Backlog size and lag, plus this process's delivery counters"""
+    db = await get_database()
+    pending = await db.outbox.count_documents({"status": "pending"})
+    failed = await db.outbox.count_documents({"status": "failed"})
+    oldest = await db.outbox.find_one({"status": "pending"}, sort=[("created_at", 1), ("_id", 1)])
+    lag_seconds: Optional[float] = None
+    if oldest:
+        lag_seconds = round((datetime.utcnow() - oldest["created_at"]).total_seconds(), 3)
+    return {
+        "pending": pending,
+        "failed": failed,
+        "lag_seconds": lag_seconds,
+        "worker": {"id": _worker_id, **_metrics}
+    }
@@ -1,8 +1,16 @@
-from .auth import get_current_user, get_current_admin, create_access_token, verify_password, hash_password
-from .onboarding import calculate_completion, calculate_health_score, detect_risk, get_next_best_action
+from .auth import (
+    get_current_user, get_current_admin, create_access_token, verify_password, hash_password,
+    invalidate_cached_user, hash_password_async, verify_password_async
+)
+from .onboarding import (
+    calculate_completion, calculate_health_score, detect_risk, get_next_best_action,
+    calculate_completion_many, detect_risk_many, summarize_students
+)
 
 __all__ = [
     "get_current_user", "get_current_admin", "create_access_token", 
-    "verify_password", "hash_password",
-    "calculate_completion", "calculate_health_score", "detect_risk", "get_next_best_action"
+    "verify_password", "hash_password", "invalidate_cached_user",
+    "verify_password_async", "hash_password_async",
+    "calculate_completion", "calculate_health_score", "detect_risk", "get_next_best_action",
+    "calculate_completion_many", "detect_risk_many", "summarize_students"
 ]
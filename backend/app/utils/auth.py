@@ -1,22 +1,43 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.database.mongo import get_database
 from app.models.user import User, Role
+from app.utils.cache import TTLCache
 from bson import ObjectId
+import os
+import sys
 
 SECRET_KEY = "your-secret-key-change-in-production-use-env-variable"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Authenticated users are cached briefly so most requests skip the users lookup
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_PROJECTION = {"password_hash": 0}
+
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+# bcrypt runs on a worker pool ("thread" or "process") instead of the event loop
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# At most LOGIN_MAX_CONCURRENCY hashes in flight; beyond LOGIN_MAX_QUEUED waiting, reject with 503
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", str(PASSWORD_HASH_WORKERS * 2)))
+LOGIN_MAX_QUEUED = int(os.getenv("LOGIN_MAX_QUEUED", "200"))
+LOGIN_RETRY_AFTER_SECONDS = 2
+
 pwd_context = CryptContext(
     schemes=["bcrypt_sha256"],
     deprecated="auto"
 )
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password[:72], hashed_password)
@@ -24,6 +45,79 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def hash_password(password: str) -> str:
     return pwd_context.hash(password[:72])
 
+_password_executor: Optional[Executor] = None
+
+def _get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+    return _password_executor
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        # cancel_futures needs Python 3.9; on 3.8 queued hashes just run out
+        if sys.version_info >= (3, 9):
+            _password_executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            _password_executor.shutdown(wait=False)
+        _password_executor = None
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), verify_password, plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), hash_password, password)
+
+class AdmissionLimiter:
+    """Caps concurrent holders and rejects new arrivals once the wait queue is full"""
+    
+    def __init__(self, max_concurrency: int, max_queued: int):
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+    
+    async def __aenter__(self):
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts in progress, please retry shortly",
+                headers={"Retry-After": str(LOGIN_RETRY_AFTER_SECONDS)},
+            )
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.active += 1
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self._semaphore.release()
+    
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected
+        }
+
+login_admission = AdmissionLimiter(LOGIN_MAX_CONCURRENCY, LOGIN_MAX_QUEUED)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -37,13 +131,30 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
+    return await _user_from_token(credentials.credentials)
+
+async def get_current_user_from_query(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> dict:
+    """Like get_current_user, but also accepts ?token= for clients that can't set headers (EventSource, links)"""
+    if credentials is not None:
+        return await _user_from_token(credentials.credentials)
+    if token:
+        return await _user_from_token(token)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def _user_from_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
@@ -51,13 +162,21 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    db = await get_database()
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        db = await get_database()
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
+        if user is None:
+            raise credentials_exception
+        user["id"] = str(user["_id"])
+        user_cache.set(user_id, user)
     
-    user["id"] = str(user["_id"])
-    return user
+    # Callers get their own copy so request code can't mutate the cached entry
+    return dict(user)
+
+def invalidate_cached_user(user_id: str) -> None:
+    """Drop a cached user; call after any write to that user's document"""
+    user_cache.pop(user_id)
 
 async def get_current_admin(
     current_user: dict = Depends(get_current_user)
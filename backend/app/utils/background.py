@@ -0,0 +1,33 @@
+"""Long-running asyncio jobs owned by the app's startup/shutdown events"""
+import asyncio
+from typing import Awaitable, Callable, List
+
+_tasks: List[asyncio.Task] = []
+
+
+def start_periodic(name: str, interval_seconds: float, job: Callable[[], Awaitable]) -> asyncio.Task:
+    """Run `job` every `interval_seconds` until shutdown; a failing run is logged and retried next tick"""
+    async def loop():
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"WARNING: background job {name} failed: {e}")
+
+    return start_background(name, loop())
+
+
+def start_background(name: str, coro: Awaitable) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _tasks.append(task)
+    return task
+
+
+async def stop_background_tasks() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -0,0 +1,59 @@
+"""Streaming NDJSON / CSV responses for report exports"""
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator, Dict, List
+from fastapi.responses import StreamingResponse
+
+# Rows are written out in groups so each chunk sent to the client is a reasonable size
+EXPORT_FLUSH_ROWS = 500
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+async def _ndjson(rows: AsyncIterator[Dict], columns: List[str]):
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({column: _value(row.get(column)) for column in columns}))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def _csv(rows: AsyncIterator[Dict], columns: List[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    async for row in rows:
+        writer.writerow([_value(row.get(column)) for column in columns])
+        pending += 1
+        if pending >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def export_response(rows: AsyncIterator[Dict], columns: List[str], export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """Stream `rows` as NDJSON or CSV without holding the report in memory"""
+    if export_format == ExportFormat.CSV:
+        body, media_type = _csv(rows, columns), "text/csv"
+    else:
+        body, media_type = _ndjson(rows, columns), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'}
+    )
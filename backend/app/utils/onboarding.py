@@ -1,32 +1,62 @@
 from typing import Dict, List, Optional
 from app.database.mongo import get_database
 from bson import ObjectId
+import math
+
+SECTIONS = ["documents", "fees", "courses", "hostel"]
+
+
+def _rounding_threshold(target: float, ndigits: int = 2) -> float:
+    """Smallest float that Python's round(x, ndigits) lifts to at least target"""
+    candidate = target - 0.5 * 10 ** -ndigits
+    if round(candidate, ndigits) >= target:
+        while round(math.nextafter(candidate, -math.inf), ndigits) >= target:
+            candidate = math.nextafter(candidate, -math.inf)
+    else:
+        while round(candidate, ndigits) < target:
+            candidate = math.nextafter(candidate, math.inf)
+    return candidate
+
+
+# A section counts as complete when its rounded score is >= 25; comparing the raw
+# score against this threshold inside MongoDB gives the same answer as Python.
+SECTION_COMPLETE_THRESHOLD = _rounding_threshold(25)
 
 async def calculate_completion(user_id: str) -> Dict:
     """Calculate onboarding completion percentage"""
     db = await get_database()
     
-    # Documents (25%)
-    total_docs = 5  # id_proof, address_proof, academic_transcript, medical_certificate, photo
     verified_docs = await db.documents.count_documents({
         "user_id": user_id,
         "status": "verified"
     })
+    fee = await db.fees.find_one({"user_id": user_id})
+    registered_courses = await db.student_courses.count_documents({"user_id": user_id})
+    hostel_app = await db.hostel_applications.find_one({"user_id": user_id})
+    
+    return completion_from_records(verified_docs, fee, registered_courses, hostel_app)
+
+def completion_from_records(
+    verified_docs: int,
+    fee: Optional[Dict],
+    registered_courses: int,
+    hostel_app: Optional[Dict]
+) -> Dict:
+    """Completion breakdown for already loaded onboarding records"""
+    # Documents (25%)
+    total_docs = 5  # id_proof, address_proof, academic_transcript, medical_certificate, photo
     documents_score = (verified_docs / total_docs) * 25 if total_docs > 0 else 0
     
     # Fees (25%)
-    fee = await db.fees.find_one({"user_id": user_id})
     fees_score = 0
     if fee:
         if fee.get("total_amount", 0) > 0:
             fees_score = (fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 25
     
     # Courses (25%)
-    registered_courses = await db.student_courses.count_documents({"user_id": user_id})
     courses_score = min(registered_courses * 5, 25)  # 5 courses = 25%
     
     # Hostel (25%)
-    hostel_app = await db.hostel_applications.find_one({"user_id": user_id})
     hostel_score = 0
     if hostel_app:
         if hostel_app.get("status") == "allocated":
@@ -44,9 +74,14 @@ async def calculate_completion(user_id: str) -> Dict:
         "hostel": round(hostel_score, 2)
     }
 
-async def calculate_health_score(user_id: str) -> int:
-    """Calculate health score (100 - missing sections * 25)"""
-    completion = await calculate_completion(user_id)
+def fee_paid_percentage(fee: Optional[Dict]) -> float:
+    """Share of the fee paid, as a percentage"""
+    if fee and fee.get("total_amount", 0) > 0:
+        return (fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 100
+    return 0
+
+def health_score_from_completion(completion: Dict) -> int:
+    """Health score for an already computed completion breakdown"""
     sections_complete = sum([
         1 if completion["documents"] >= 25 else 0,
         1 if completion["fees"] >= 25 else 0,
@@ -57,20 +92,25 @@ async def calculate_health_score(user_id: str) -> int:
     health_score = 100 - (missing_sections * 25)
     return max(0, health_score)
 
+async def calculate_health_score(user_id: str) -> int:
+    """Calculate health score (100 - missing sections * 25)"""
+    completion = await calculate_completion(user_id)
+    return health_score_from_completion(completion)
+
 async def detect_risk(user_id: str) -> Dict:
     """Detect risk level based on onboarding status"""
     db = await get_database()
     
     fee = await db.fees.find_one({"user_id": user_id})
-    fee_percentage = 0
-    if fee and fee.get("total_amount", 0) > 0:
-        fee_percentage = (fee.get("paid_amount", 0) / fee.get("total_amount", 1)) * 100
-    
     pending_docs = await db.documents.count_documents({
         "user_id": user_id,
         "status": {"$in": ["pending", "uploaded"]}
     })
     
+    return risk_from_status(fee_paid_percentage(fee), pending_docs)
+
+def risk_from_status(fee_percentage: float, pending_docs: int) -> Dict:
+    """Risk level for a known fee percentage and pending document count"""
     if fee_percentage < 50 and pending_docs > 0:
         return {"level": "HIGH", "message": "Fee payment incomplete and documents pending"}
     elif fee_percentage < 50 or pending_docs > 2:
@@ -81,7 +121,10 @@ async def detect_risk(user_id: str) -> Dict:
 async def get_next_best_action(user_id: str) -> Dict:
     """Get the next best action for the student"""
     completion = await calculate_completion(user_id)
-    
+    return next_best_action_from_completion(completion)
+
+def next_best_action_from_completion(completion: Dict) -> Dict:
+    """Next best action for an already computed completion breakdown"""
     if completion["documents"] < 25:
         return {
             "section": "documents",
@@ -112,3 +155,194 @@ async def get_next_best_action(user_id: str) -> Dict:
             "action": "All onboarding steps completed!",
             "priority": "low"
         }
+
+
+async def _count_by_user(collection, user_ids: List[str], extra_match: Optional[Dict] = None) -> Dict[str, int]:
+    match = {"user_id": {"$in": user_ids}, **(extra_match or {})}
+    counts = {}
+    async for row in collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+    ]):
+        counts[row["_id"]] = row["count"]
+    return counts
+
+async def _first_by_user(collection, user_ids: List[str], projection: Dict) -> Dict[str, Dict]:
+    # Keeps the first match per user, the document find_one would have returned
+    records = {}
+    async for doc in collection.find({"user_id": {"$in": user_ids}}, {"user_id": 1, **projection}):
+        records.setdefault(doc["user_id"], doc)
+    return records
+
+async def calculate_completion_many(user_ids: List[str]) -> Dict[str, Dict]:
+    """calculate_completion for a cohort in one query per collection, keyed by user id"""
+    db = await get_database()
+    
+    verified_docs = await _count_by_user(db.documents, user_ids, {"status": "verified"})
+    fees = await _first_by_user(db.fees, user_ids, {"total_amount": 1, "paid_amount": 1})
+    registered_courses = await _count_by_user(db.student_courses, user_ids)
+    hostel_apps = await _first_by_user(db.hostel_applications, user_ids, {"status": 1})
+    
+    return {
+        user_id: completion_from_records(
+            verified_docs.get(user_id, 0),
+            fees.get(user_id),
+            registered_courses.get(user_id, 0),
+            hostel_apps.get(user_id)
+        )
+        for user_id in user_ids
+    }
+
+async def detect_risk_many(user_ids: List[str]) -> Dict[str, Dict]:
+    """detect_risk for a cohort in one query per collection, keyed by user id"""
+    db = await get_database()
+    
+    fees = await _first_by_user(db.fees, user_ids, {"total_amount": 1, "paid_amount": 1})
+    pending_docs = await _count_by_user(
+        db.documents, user_ids, {"status": {"$in": ["pending", "uploaded"]}}
+    )
+    
+    return {
+        user_id: risk_from_status(fee_paid_percentage(fees.get(user_id)), pending_docs.get(user_id, 0))
+        for user_id in user_ids
+    }
+
+
+def _student_scores_pipeline() -> List[Dict]:
+    """Stages that score every student the same way calculate_completion and detect_risk do"""
+    return [
+        {"$match": {"role": "student"}},
+        {"$project": {"full_name": 1, "email": 1, "uid": {"$toString": "$_id"}}},
+        {"$lookup": {
+            "from": "documents", "localField": "uid", "foreignField": "user_id",
+            "pipeline": [{"$project": {"_id": 0, "status": 1}}],
+            "as": "documents"
+        }},
+        {"$lookup": {
+            "from": "fees", "localField": "uid", "foreignField": "user_id",
+            "pipeline": [{"$limit": 1}, {"$project": {"_id": 0, "total_amount": 1, "paid_amount": 1}}],
+            "as": "fee"
+        }},
+        {"$lookup": {
+            "from": "student_courses", "localField": "uid", "foreignField": "user_id",
+            "pipeline": [{"$project": {"_id": 1}}],
+            "as": "courses"
+        }},
+        {"$lookup": {
+            "from": "hostel_applications", "localField": "uid", "foreignField": "user_id",
+            "pipeline": [{"$limit": 1}, {"$project": {"_id": 0, "status": 1}}],
+            "as": "hostel"
+        }},
+        {"$project": {
+            "full_name": 1,
+            "email": 1,
+            "verified_docs": {"$size": {"$filter": {
+                "input": "$documents", "cond": {"$eq": ["$$this.status", "verified"]}
+            }}},
+            "pending_docs": {"$size": {"$filter": {
+                "input": "$documents", "cond": {"$in": ["$$this.status", ["pending", "uploaded"]]}
+            }}},
+            "fee_total": {"$ifNull": [{"$first": "$fee.total_amount"}, 0]},
+            "fee_paid": {"$ifNull": [{"$first": "$fee.paid_amount"}, 0]},
+            "course_count": {"$size": "$courses"},
+            "hostel_status": {"$first": "$hostel.status"}
+        }},
+        {"$addFields": {
+            "documents": {"$multiply": [{"$divide": ["$verified_docs", 5]}, 25]},
+            "fees": {"$cond": [
+                {"$gt": ["$fee_total", 0]},
+                {"$multiply": [{"$divide": ["$fee_paid", "$fee_total"]}, 25]},
+                0
+            ]},
+            "fee_percentage": {"$cond": [
+                {"$gt": ["$fee_total", 0]},
+                {"$multiply": [{"$divide": ["$fee_paid", "$fee_total"]}, 100]},
+                0
+            ]},
+            "courses": {"$min": [{"$multiply": ["$course_count", 5]}, 25]},
+            "hostel": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$hostel_status", "allocated"]}, "then": 25},
+                    {"case": {"$eq": ["$hostel_status", "pending"]}, "then": 10}
+                ],
+                "default": 0
+            }}
+        }},
+        {"$addFields": {
+            # Nested pairwise additions keep the float result identical to Python's a + b + c + d
+            "total_completion": {"$add": [
+                {"$add": [{"$add": ["$documents", "$fees"]}, "$courses"]}, "$hostel"
+            ]},
+            "risk": {"$switch": {
+                "branches": [
+                    {
+                        "case": {"$and": [{"$lt": ["$fee_percentage", 50]}, {"$gt": ["$pending_docs", 0]}]},
+                        "then": {"level": "HIGH", "message": "Fee payment incomplete and documents pending"}
+                    },
+                    {
+                        "case": {"$or": [{"$lt": ["$fee_percentage", 50]}, {"$gt": ["$pending_docs", 2]}]},
+                        "then": {"level": "MEDIUM", "message": "One or more sections incomplete"}
+                    }
+                ],
+                "default": {"level": "LOW", "message": "Onboarding progressing well"}
+            }}
+        }}
+    ]
+
+async def summarize_students(risk_limit: int = 10) -> Dict:
+    """Cohort-wide completion, section and risk metrics in a single aggregation"""
+    db = await get_database()
+
+    pipeline = _student_scores_pipeline() + [
+        {"$facet": {
+            # Totals are grouped by raw value so the per-student round() happens in Python
+            "totals": [{"$group": {"_id": "$total_completion", "count": {"$sum": 1}}}],
+            "sections": [{"$group": {
+                "_id": None,
+                **{
+                    section: {"$sum": {"$cond": [
+                        {"$gte": [f"${section}", SECTION_COMPLETE_THRESHOLD]}, 1, 0
+                    ]}}
+                    for section in SECTIONS
+                }
+            }}],
+            "risk_students": [
+                {"$match": {"risk.level": {"$in": ["HIGH", "MEDIUM"]}}},
+                {"$sort": {"_id": 1}},
+                {"$limit": risk_limit},
+                {"$project": {"full_name": 1, "email": 1, "total_completion": 1, "risk": 1}}
+            ]
+        }}
+    ]
+    result = (await db.users.aggregate(pipeline, allowDiskUse=True).to_list(length=1))[0]
+
+    total_students = sum(row["count"] for row in result["totals"])
+    completion_sum = sum(round(row["_id"], 2) * row["count"] for row in result["totals"])
+    avg_completion = completion_sum / total_students if total_students else 0
+
+    complete = result["sections"][0] if result["sections"] else {}
+    section_metrics = {
+        section: {
+            "complete": complete.get(section, 0),
+            "pending": total_students - complete.get(section, 0)
+        }
+        for section in SECTIONS
+    }
+
+    risk_students = [
+        {
+            "id": str(row["_id"]),
+            "name": row.get("full_name"),
+            "email": row.get("email"),
+            "completion": round(row["total_completion"], 2),
+            "risk": row["risk"]
+        }
+        for row in result["risk_students"]
+    ]
+
+    return {
+        "total_students": total_students,
+        "average_completion": round(avg_completion, 2),
+        "section_metrics": section_metrics,
+        "risk_students": risk_students
+    }
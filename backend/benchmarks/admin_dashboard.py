@@ -0,0 +1,69 @@
+"""
+Benchmark the admin dashboard: per-student N+1 loop vs the aggregation pipeline
+Run from backend/: python -m benchmarks.admin_dashboard [--sizes 1000 10000 50000]
+"""
+import argparse
+import asyncio
+from app.database.mongo import get_database
+from app.utils.onboarding import calculate_completion, detect_risk, summarize_students
+from benchmarks.common import bench_database, seed_students, timed
+
+
+async def legacy_summary():
+    """The dashboard as it was computed before: two queries-per-student passes"""
+    db = await get_database()
+    completions = []
+    risk_students = []
+    section_metrics = {s: {"complete": 0, "pending": 0} for s in ["documents", "fees", "courses", "hostel"]}
+
+    async for user in db.users.find({"role": "student"}):
+        user_id = str(user["_id"])
+        completion = await calculate_completion(user_id)
+        risk = await detect_risk(user_id)
+        completions.append(completion["total_completion"])
+        if risk["level"] in ["HIGH", "MEDIUM"]:
+            risk_students.append({
+                "id": user_id,
+                "name": user.get("full_name"),
+                "email": user.get("email"),
+                "completion": completion["total_completion"],
+                "risk": risk
+            })
+        for section in section_metrics:
+            key = "complete" if completion[section] >= 25 else "pending"
+            section_metrics[section][key] += 1
+
+    avg_completion = sum(completions) / len(completions) if completions else 0
+    return {
+        "total_students": len(completions),
+        "average_completion": round(avg_completion, 2),
+        "section_metrics": section_metrics,
+        "risk_students": risk_students[:10]
+    }
+
+
+async def main(sizes, skip_legacy_above):
+    print(f"{'students':>10} {'legacy (s)':>12} {'pipeline (s)':>14} {'speedup':>9} {'match':>6}")
+    for size in sizes:
+        async with bench_database() as db:
+            await seed_students(db, size)
+            pipeline_result, pipeline_time = await timed(summarize_students())
+            if size > skip_legacy_above:
+                print(f"{size:>10} {'skipped':>12} {pipeline_time:>14.3f} {'-':>9} {'-':>6}")
+                continue
+            legacy_result, legacy_time = await timed(legacy_summary())
+            print(
+                f"{size:>10} {legacy_time:>12.3f} {pipeline_time:>14.3f} "
+                f"{legacy_time / pipeline_time:>8.1f}x {str(legacy_result == pipeline_result):>6}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument(
+        "--skip-legacy-above", type=int, default=50000,
+        help="Only time the pipeline for cohorts larger than this"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.skip_legacy_above))
@@ -0,0 +1,50 @@
+"""
+Benchmark notification fan-out: one create_notification per student vs create_notifications_bulk
+Run from backend/: python -m benchmarks.broadcast [--students 20000] [--per-call-sample 2000]
+"""
+import argparse
+import asyncio
+from app.models.notification import NotificationCreate, NotificationType
+from app.services.notification_service import create_notification, create_notifications_bulk
+from benchmarks.common import bench_database, seed_students, timed
+
+
+def announcement(user_id: str) -> NotificationCreate:
+    return NotificationCreate(
+        user_id=user_id,
+        title="Hostel allotment list published",
+        message="Check the hostel page for your allotment.",
+        notification_type=NotificationType.INFO,
+        link="/hostel"
+    )
+
+
+async def per_call(user_ids):
+    for user_id in user_ids:
+        await create_notification(announcement(user_id))
+
+
+async def main(students: int, per_call_sample: int, chunk_size: int):
+    async with bench_database() as db:
+        user_ids = await seed_students(db, students)
+
+        sample = user_ids[:per_call_sample]
+        _, per_call_time = await timed(per_call(sample))
+        await db.notifications.delete_many({})
+        await db.notification_counters.delete_many({})
+
+        created, bulk_time = await timed(
+            create_notifications_bulk([announcement(user_id) for user_id in user_ids], chunk_size=chunk_size)
+        )
+
+    print(f"per-call: {len(sample)} notifications in {per_call_time:.2f}s ({len(sample) / per_call_time:,.0f}/s)")
+    print(f"bulk:     {created} notifications in {bulk_time:.2f}s ({created / bulk_time:,.0f}/s, chunks of {chunk_size})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--per-call-sample", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.per_call_sample, args.chunk_size))
@@ -0,0 +1,93 @@
+"""Shared helpers for the benchmark scripts"""
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from app.database import mongo
+
+load_dotenv()
+
+BENCH_DATABASE_NAME = os.getenv("BENCH_DATABASE_NAME", "campusflow_bench")
+DOCUMENT_TYPES = ["id_proof", "address_proof", "academic_transcript", "medical_certificate", "photo"]
+
+
+@asynccontextmanager
+async def bench_database(drop: bool = True):
+    """Point the app at a scratch database for the duration of a benchmark"""
+    client = AsyncIOMotorClient(mongo.MONGO_URI)
+    db = client[BENCH_DATABASE_NAME]
+    await client.drop_database(BENCH_DATABASE_NAME)
+    mongo.client, mongo.database = client, db
+    try:
+        yield db
+    finally:
+        if drop:
+            await client.drop_database(BENCH_DATABASE_NAME)
+        client.close()
+
+
+async def seed_students(db, count: int, seed: int = 42, batch_size: int = 5000):
+    """Insert `count` students with randomised documents, fees, courses and hostel state"""
+    rnd = random.Random(seed)
+    user_ids = []
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        users = [
+            {
+                "email": f"student{start + i}@bench.campusflow",
+                "full_name": f"Student {start + i}",
+                "student_id": f"BENCH{start + i:06d}",
+                "role": "student",
+                "password_hash": "x"
+            }
+            for i in range(size)
+        ]
+        result = await db.users.insert_many(users)
+        ids = [str(oid) for oid in result.inserted_ids]
+        user_ids.extend(ids)
+
+        documents, fees, courses, hostel = [], [], [], []
+        for user_id in ids:
+            for doc_type in DOCUMENT_TYPES:
+                documents.append({
+                    "user_id": user_id,
+                    "document_type": doc_type,
+                    "status": rnd.choice(["pending", "uploaded", "verified"])
+                })
+            paid = rnd.choice([0.0, 12000.0, 25500.0, 51000.0, round(rnd.uniform(0, 51000), 2)])
+            fees.append({
+                "user_id": user_id,
+                "total_amount": 51000,
+                "paid_amount": paid,
+                "remaining_amount": 51000 - paid
+            })
+            for n in range(rnd.randint(0, 5)):
+                courses.append({"user_id": user_id, "course_id": f"bench-course-{n}"})
+            status = rnd.choice([None, "pending", "allocated"])
+            if status:
+                hostel.append({"user_id": user_id, "status": status, "preferences": {}})
+
+        await db.documents.insert_many(documents)
+        await db.fees.insert_many(fees)
+        if courses:
+            await db.student_courses.insert_many(courses)
+        if hostel:
+            await db.hostel_applications.insert_many(hostel)
+    return user_ids
+
+
+async def timed(coro):
+    """Await `coro` and return (result, elapsed seconds)"""
+    started = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - started
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
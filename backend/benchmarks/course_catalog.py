@@ -0,0 +1,65 @@
+"""
+Benchmark the course catalog cache and the batched my-courses lookup against the per-course queries they replace
+Run from backend/: python -m benchmarks.course_catalog [--courses 300] [--registered 8]
+"""
+import argparse
+import asyncio
+from bson import ObjectId
+from app.routes.courses import get_my_courses
+from app.services.course_catalog import get_course_catalog, load_course_catalog
+from app.utils.mongo import mongo_to_dict
+from benchmarks.common import bench_database, timed, percentile
+
+
+async def legacy_catalog(db):
+    return {"courses": [mongo_to_dict(course) async for course in db.courses.find({})]}
+
+
+async def legacy_my_courses(db, user_id: str):
+    courses = []
+    async for sc in db.student_courses.find({"user_id": user_id}):
+        course = await db.courses.find_one({"_id": ObjectId(sc["course_id"])})
+        if course:
+            sc_dict = mongo_to_dict(sc)
+            sc_dict["course"] = mongo_to_dict(course)
+            courses.append(sc_dict)
+    return courses
+
+
+async def sample(label: str, runs: int, make_call):
+    samples = []
+    for _ in range(runs):
+        _, elapsed = await timed(make_call())
+        samples.append(elapsed)
+    print(f"{label:<32} p50={percentile(samples, 50) * 1000:.2f}ms p99={percentile(samples, 99) * 1000:.2f}ms")
+
+
+async def main(course_count: int, registered: int, runs: int):
+    async with bench_database() as db:
+        result = await db.courses.insert_many([
+            {"course_code": f"BENCH{n:04d}", "course_name": f"Course {n}", "credits": 3, "description": "x" * 200}
+            for n in range(course_count)
+        ])
+        user = await db.users.insert_one({"email": "student@bench.campusflow", "role": "student"})
+        user_id = str(user.inserted_id)
+        await db.fees.insert_one({"user_id": user_id, "total_amount": 51000, "paid_amount": 51000, "remaining_amount": 0})
+        await db.student_courses.insert_many([
+            {"user_id": user_id, "course_id": str(course_id), "lms_activated": False}
+            for course_id in result.inserted_ids[:registered]
+        ])
+        await load_course_catalog()
+        print(f"{course_count} courses, student registered for {registered}")
+
+        await sample("catalog: query every request", runs, lambda: legacy_catalog(db))
+        await sample("catalog: cached snapshot", runs, get_course_catalog)
+        await sample("my-courses: one query per course", runs, lambda: legacy_my_courses(db, user_id))
+        await sample("my-courses: cached lookup", runs, lambda: get_my_courses(current_user={"id": user_id}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--registered", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.courses, args.registered, args.runs))
@@ -0,0 +1,103 @@
+"""
+Registration rush: thousands of students registering for one capped course at the same time, first with a
+read-then-write capacity check (the obvious approach), then with the atomic seat counter and waitlist,
+then a wave of drops that should be filled from the waitlist
+Run from backend/: python -m benchmarks.course_rush [--students 5000] [--capacity 300] [--concurrency 500]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from app.database.indexes import ensure_indexes
+from app.database.mongo import get_database
+from app.models.course import CourseRegistration
+from app.routes.courses import drop_course, register_courses
+from app.services.onboarding_service import OnboardingContext
+from benchmarks.common import bench_database, seed_students, percentile
+
+
+async def checked_then_inserted(course_id: str, capacity: int, user_id: str):
+    """Count the course's registrations, then insert if there was room"""
+    db = await get_database()
+    taken = await db.student_courses.count_documents({"course_id": course_id})
+    if taken >= capacity:
+        raise HTTPException(status_code=409, detail="Course is full")
+    await db.student_courses.insert_one({
+        "user_id": user_id, "course_id": course_id, "registered_at": datetime.utcnow(), "lms_activated": False
+    })
+
+
+async def rush(label: str, user_ids, concurrency: int, call):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(user_id: str):
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await call(user_id)
+            except HTTPException:
+                pass
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<16} {len(user_ids)} requests in {elapsed:.2f}s ({len(user_ids) / elapsed:.0f}/s) "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+async def report(label: str, course_id: str, capacity: int):
+    db = await get_database()
+    registered = await db.student_courses.count_documents({"course_id": course_id})
+    waitlisted = await db.course_waitlist.count_documents({"course_id": course_id})
+    counter = (await db.courses.find_one({"_id": ObjectId(course_id)}) or {}).get("registered_count")
+    verdict = "OK" if registered <= capacity else f"OVERBOOKED by {registered - capacity}"
+    print(f"{label:<16} registered={registered}/{capacity} waitlisted={waitlisted} counter={counter} {verdict}")
+
+
+async def main(students: int, capacity: int, concurrency: int, drops: int):
+    async with bench_database() as db:
+        user_ids = await seed_students(db, students)
+        await db.fees.update_many({}, {"$set": {"paid_amount": 51000.0, "remaining_amount": 0.0}})
+        await db.student_courses.delete_many({})
+        await ensure_indexes()
+
+        legacy = await db.courses.insert_one({"course_code": "RUSH0", "course_name": "Legacy", "credits": 3, "capacity": capacity})
+        legacy_id = str(legacy.inserted_id)
+        await rush("check then insert", user_ids, concurrency, lambda user_id: checked_then_inserted(legacy_id, capacity, user_id))
+        await report("check then insert", legacy_id, capacity)
+
+        course = await db.courses.insert_one({
+            "course_code": "RUSH1", "course_name": "Rush", "credits": 3, "capacity": capacity, "registered_count": 0
+        })
+        course_id = str(course.inserted_id)
+        registration = CourseRegistration(course_ids=[course_id])
+        await rush(
+            "seat counter", user_ids, concurrency,
+            lambda user_id: register_courses(registration, onboarding=OnboardingContext(user_id))
+        )
+        await report("seat counter", course_id, capacity)
+
+        holders = [sc["user_id"] async for sc in db.student_courses.find({"course_id": course_id}).limit(drops)]
+        await rush(
+            f"{len(holders)} drops", holders, concurrency,
+            lambda user_id: drop_course(course_id, onboarding=OnboardingContext(user_id))
+        )
+        await report("after drops", course_id, capacity)
+        promoted = await db.student_courses.count_documents({"course_id": course_id, "from_waitlist": True})
+        print(f"{'':<16} promoted from waitlist={promoted}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--capacity", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--drops", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.capacity, args.concurrency, args.drops))
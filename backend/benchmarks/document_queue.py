@@ -0,0 +1,71 @@
+"""
+Benchmark the admin document review queue: first page and a page deep into the queue
+Run from backend/: python -m benchmarks.document_queue [--students 20000] (five documents per student)
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from app.database.indexes import ensure_indexes
+from app.models.document import DocumentType
+from app.routes.admin import get_document_review_queue
+from benchmarks.common import bench_database, seed_students, timed, percentile
+
+ADMIN = {"id": "bench-admin", "role": "admin"}
+
+
+async def spread_updated_at(db, seed: int = 7, batch_size: int = 5000):
+    """Give every document a distinct updated_at over the last 30 days"""
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    batch = []
+    async for doc in db.documents.find({}, {"_id": 1}):
+        updated_at = now - timedelta(seconds=rnd.randint(0, 30 * 24 * 3600))
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"updated_at": updated_at}}))
+        if len(batch) >= batch_size:
+            await db.documents.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.documents.bulk_write(batch, ordered=False)
+
+
+async def sample(label: str, runs: int, make_call):
+    samples = []
+    for _ in range(runs):
+        _, elapsed = await timed(make_call())
+        samples.append(elapsed)
+    print(f"{label:<28} p50={percentile(samples, 50) * 1000:.1f}ms p99={percentile(samples, 99) * 1000:.1f}ms")
+
+
+async def main(students: int, runs: int, deep_pages: int):
+    async with bench_database() as db:
+        await seed_students(db, students)
+        await spread_updated_at(db)
+        await ensure_indexes()
+        total = await db.documents.count_documents({})
+        queued = await db.documents.count_documents({"status": "uploaded"})
+        print(f"{total} documents, {queued} awaiting review")
+
+        def first_page(document_type=None):
+            return lambda: get_document_review_queue(document_type, 20, None, current_admin=ADMIN)
+
+        await sample("first page", runs, first_page())
+        await sample("first page, photo only", runs, first_page(DocumentType.PHOTO))
+
+        cursor = None
+        for _ in range(deep_pages):
+            cursor = (await get_document_review_queue(None, 100, cursor, current_admin=ADMIN))["next_cursor"]
+        await sample(
+            f"page after {deep_pages * 100} rows", runs,
+            lambda: get_document_review_queue(None, 20, cursor, current_admin=ADMIN)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--deep-pages", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.runs, args.deep_pages))
@@ -0,0 +1,108 @@
+"""
+Stress fee payments: parallel payments against one balance, old read-modify-write vs the atomic update,
+plus parallel retries sharing one Idempotency-Key
+Run from backend/: python -m benchmarks.fee_payments [--payments 200] [--amount 500]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from fastapi import HTTPException
+from app.database.indexes import ensure_indexes
+from app.database.mongo import get_database
+from app.models.fee import FeePayment
+from app.models.notification import NotificationCreate, NotificationType
+from app.routes.fees import make_payment
+from app.services.onboarding_service import refresh_onboarding_state
+from app.services.outbox import enqueue_notification
+from benchmarks.common import bench_database, percentile
+
+TOTAL = 51000.0
+
+
+async def legacy_payment(payment_data: FeePayment, user_id: str):
+    """make_payment as it was: read the balance, then write absolute values back"""
+    db = await get_database()
+    fee = await db.fees.find_one({"user_id": user_id})
+    if payment_data.amount > fee["remaining_amount"]:
+        raise HTTPException(status_code=400, detail="Payment amount exceeds remaining balance")
+    new_paid = fee["paid_amount"] + payment_data.amount
+    await db.fees.update_one(
+        {"user_id": user_id},
+        {
+            "$set": {"paid_amount": new_paid, "remaining_amount": fee["total_amount"] - new_paid, "updated_at": datetime.utcnow()},
+            "$push": {"transactions": {"amount": payment_data.amount}}
+        }
+    )
+    await refresh_onboarding_state(user_id)
+    await enqueue_notification(NotificationCreate(
+        user_id=user_id,
+        title="Payment Received",
+        message=f"Payment of ₹{payment_data.amount} has been received successfully.",
+        notification_type=NotificationType.TASK_COMPLETION,
+        link="/fees"
+    ))
+
+
+async def run(label: str, pay, payments: int, amount: float):
+    db = await get_database()
+    user_id = f"stress-{label}"
+    await db.fees.insert_one({"user_id": user_id, "total_amount": TOTAL, "paid_amount": 0.0, "remaining_amount": TOTAL})
+    latencies, outcomes = [], {"accepted": 0, "rejected": 0}
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            await pay(FeePayment(amount=amount), user_id)
+            outcomes["accepted"] += 1
+        except HTTPException:
+            outcomes["rejected"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(payments)))
+    elapsed = time.perf_counter() - started
+    fee = await db.fees.find_one({"user_id": user_id})
+    # Legacy payments pushed onto the fee document; current ones go to the ledger
+    recorded = len(fee.get("transactions", [])) + await db.fee_transactions.count_documents({"user_id": user_id})
+    expected_paid = min(outcomes["accepted"] * amount, TOTAL)
+    correct = fee["paid_amount"] == outcomes["accepted"] * amount and recorded == outcomes["accepted"]
+    print(
+        f"{label:<8} accepted={outcomes['accepted']} rejected={outcomes['rejected']} "
+        f"paid={fee['paid_amount']:.0f} (expected {expected_paid:.0f}) transactions={recorded} "
+        f"{'OK' if correct else 'LOST UPDATES'} | {elapsed:.2f}s p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+async def retries(attempts: int, amount: float):
+    db = await get_database()
+    user_id = "stress-idempotent"
+    await db.fees.insert_one({"user_id": user_id, "total_amount": TOTAL, "paid_amount": 0.0, "remaining_amount": TOTAL})
+    results = await asyncio.gather(*(
+        make_payment(FeePayment(amount=amount), idempotency_key="retry-1", current_user={"id": user_id})
+        for _ in range(attempts)
+    ), return_exceptions=True)
+    replayed = sum(1 for r in results if isinstance(r, dict))
+    in_progress = sum(1 for r in results if isinstance(r, HTTPException) and r.status_code == 409)
+    charges = await db.fee_transactions.count_documents({"user_id": user_id})
+    print(
+        f"idempotency: {attempts} parallel requests with one key -> {replayed} responses, {in_progress} in-progress 409s, "
+        f"{charges} charge(s) of {amount:.0f}"
+    )
+
+
+async def main(payments: int, amount: float):
+    async with bench_database():
+        await ensure_indexes()
+        await run("legacy", legacy_payment, payments, amount)
+        await run("atomic", lambda data, user_id: make_payment(data, None, current_user={"id": user_id}), payments, amount)
+        await retries(20, amount)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=200, help="parallel payments; more than fit the balance")
+    parser.add_argument("--amount", type=float, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.payments, args.amount))
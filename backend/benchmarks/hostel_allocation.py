@@ -0,0 +1,90 @@
+"""
+Benchmark the batch hostel allocator (a dry run and a real run over a large backlog of pending applications),
+then a burst of concurrent single-bed assignments against one hostel's last free beds
+Run from backend/: python -m benchmarks.hostel_allocation [--applications 20000] [--beds 4000]
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+from app.database.indexes import ensure_indexes
+from app.services.hostel_allocator import allocate_pending_applications
+from app.services.hostel_rooms import assign_bed, create_rooms
+from benchmarks.common import bench_database, timed
+
+HOSTELS = ["North Hostel", "South Hostel", "East Hostel", "West Hostel"]
+# Preference popularity: most students want North first
+WEIGHTS = [5, 3, 2, 1]
+
+
+async def seed_applications(db, count: int, seed: int = 11, batch_size: int = 5000):
+    rnd = random.Random(seed)
+    started = datetime.utcnow() - timedelta(days=30)
+    for start in range(0, count, batch_size):
+        applications = []
+        for n in range(start, min(start + batch_size, count)):
+            choices = []
+            while len(choices) < 3:
+                name = rnd.choices(HOSTELS, WEIGHTS)[0]
+                if name not in choices:
+                    choices.append(name)
+            applications.append({
+                "user_id": f"bench-student-{n}",
+                "preferences": {"preference_1": choices[0], "preference_2": choices[1], "preference_3": choices[2]},
+                "status": "pending",
+                "allocated_hostel": None,
+                "allocated_room": None,
+                "applied_at": started + timedelta(seconds=rnd.randint(0, 30 * 24 * 3600))
+            })
+        await db.hostel_applications.insert_many(applications)
+
+
+async def main(applications: int, beds: int, burst: int):
+    async with bench_database() as db:
+        await db.hostels.insert_many([
+            {"name": name, "capacity": beds, "beds_per_room": 2} for name in HOSTELS
+        ])
+        for name in HOSTELS:
+            await create_rooms(name, beds)
+        await seed_applications(db, applications)
+        await ensure_indexes()
+        print(f"{applications} pending applications, {beds} beds in each of {len(HOSTELS)} hostels")
+
+        plan, elapsed = await timed(allocate_pending_applications(dry_run=True))
+        print(f"dry run      {elapsed:.2f}s allocated={plan['allocated']} unassigned={plan['unassigned']}")
+
+        report, elapsed = await timed(allocate_pending_applications())
+        print(f"allocation   {elapsed:.2f}s allocated={report['allocated']} unassigned={report['unassigned']}")
+        for hostel in report["hostels"]:
+            print(f"  {hostel['hostel']:<14} {hostel['allocated']:>6} allocated, {hostel['available_after']} beds left")
+
+        # Free a few beds in one hostel, then have many more students than that race for them
+        target = HOSTELS[0]
+        await db.hostel_rooms.update_many(
+            {"hostel": target, "room_number": {"$lte": "005"}},
+            {"$set": {"free_beds": 2, "occupants": []}}
+        )
+        results, elapsed = await timed(asyncio.gather(*(
+            assign_bed(target, f"burst-student-{n}") for n in range(burst)
+        )))
+        print(f"burst        {elapsed:.2f}s {burst} concurrent assignments, {sum(1 for room in results if room)} got a bed")
+
+        mismatched = []
+        for name in HOSTELS:
+            allocated = await db.hostel_applications.count_documents({"allocated_hostel": name, "status": "allocated"})
+            async for room in db.hostel_rooms.find({"hostel": name}, {"capacity": 1, "free_beds": 1, "occupants": 1}):
+                if room["free_beds"] < 0 or len(room["occupants"]) + room["free_beds"] != room["capacity"]:
+                    mismatched.append(f"{name}/{room['_id']}")
+            if allocated > beds:
+                mismatched.append(name)
+        queued = await db.outbox.count_documents({})
+        print(f"notifications queued={queued} {'OK' if not mismatched else 'OVERSOLD: ' + ', '.join(mismatched[:10])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applications", type=int, default=20000)
+    parser.add_argument("--beds", type=int, default=4000)
+    parser.add_argument("--burst", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.applications, args.beds, args.burst))
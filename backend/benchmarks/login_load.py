@@ -0,0 +1,71 @@
+"""
+Login load test against a running server
+Measures login throughput and the latency of an unrelated endpoint while logins are in flight.
+Run from backend/: python -m benchmarks.login_load --base-url http://localhost:8000 --logins 500 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import httpx
+from benchmarks.common import percentile
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def login(client: httpx.AsyncClient, credentials: dict, semaphore: asyncio.Semaphore, results: dict):
+    async with semaphore:
+        response = await client.post("/api/auth/login", json=credentials)
+        results[response.status_code] = results.get(response.status_code, 0) + 1
+
+
+async def main(base_url: str, logins: int, concurrency: int, probe_path: str):
+    credentials = {"email": f"loadtest-{uuid.uuid4().hex[:8]}@bench.campusflow", "password": "loadtest-password"}
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        response = await client.post("/api/auth/register", json={**credentials, "full_name": "Load Test"})
+        response.raise_for_status()
+
+        idle_samples = []
+        stop = asyncio.Event()
+        idle_probe = asyncio.create_task(probe(client, probe_path, stop, idle_samples))
+        await asyncio.sleep(2)
+        stop.set()
+        await idle_probe
+
+        loaded_samples = []
+        stop = asyncio.Event()
+        loaded_probe = asyncio.create_task(probe(client, probe_path, stop, loaded_samples))
+        results = {}
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(login(client, credentials, semaphore, results) for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await loaded_probe
+
+    succeeded = results.get(200, 0)
+    print(f"logins: {logins} at concurrency {concurrency} in {elapsed:.2f}s")
+    print(f"  status codes: {dict(sorted(results.items()))}")
+    print(f"  throughput: {succeeded / elapsed:.1f} successful logins/s")
+    for label, samples in [("idle", idle_samples), ("under login load", loaded_samples)]:
+        print(
+            f"{probe_path} {label}: n={len(samples)} "
+            f"p50={percentile(samples, 50) * 1000:.1f}ms p99={percentile(samples, 99) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--probe-path", default="/health")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.logins, args.concurrency, args.probe_path))
@@ -0,0 +1,102 @@
+"""
+Idle notification-stream capacity of a running server
+Opens --connections SSE streams (spread over enough users to respect the per-user cap), holds them
+idle and reports how many stayed connected and, with --pid, the server's resident memory.
+Run from backend/: python -m benchmarks.sse_connections --base-url http://localhost:8000 --connections 2000 --pid <uvicorn pid>
+"""
+import argparse
+import asyncio
+import math
+import time
+import uuid
+import httpx
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def register_users(client: httpx.AsyncClient, count: int) -> list:
+    tokens = []
+    for _ in range(count):
+        email = f"sse-{uuid.uuid4().hex[:10]}@bench.campusflow"
+        response = await client.post(
+            "/api/auth/register",
+            json={"email": email, "password": "sse-bench-password", "full_name": "SSE Bench"}
+        )
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+
+async def hold_stream(client: httpx.AsyncClient, token: str, stop: asyncio.Event, stats: dict):
+    try:
+        async with client.stream("GET", "/api/notifications/stream", params={"token": token}) as response:
+            if response.status_code != 200:
+                stats["rejected"] += 1
+                return
+            lines = response.aiter_lines()
+            async for line in lines:
+                if line.startswith("event: unread_count"):
+                    stats["connected"] += 1
+                    break
+
+            async def drain():
+                async for _ in lines:
+                    pass
+
+            stop_wait = asyncio.create_task(stop.wait())
+            reader = asyncio.create_task(drain())
+            await asyncio.wait({stop_wait, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if reader.done():
+                stats["closed_by_server"] += 1
+            stop_wait.cancel()
+            reader.cancel()
+    except httpx.HTTPError:
+        stats["errors"] += 1
+
+
+async def main(base_url: str, connections: int, per_user: int, hold_seconds: float, pid: int):
+    limits = httpx.Limits(max_connections=connections + 10, max_keepalive_connections=0)
+    timeout = httpx.Timeout(30, read=None)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        tokens = await register_users(client, math.ceil(connections / per_user))
+        baseline = rss_mb(pid) if pid else None
+
+        stats = {"connected": 0, "rejected": 0, "errors": 0, "closed_by_server": 0}
+        stop = asyncio.Event()
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(hold_stream(client, tokens[i // per_user], stop, stats))
+            for i in range(connections)
+        ]
+        while stats["connected"] + stats["rejected"] + stats["errors"] < connections:
+            await asyncio.sleep(0.5)
+            if time.perf_counter() - started > 120:
+                break
+        ramp = time.perf_counter() - started
+        await asyncio.sleep(hold_seconds)
+        loaded = rss_mb(pid) if pid else None
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"opened {stats['connected']}/{connections} streams in {ramp:.1f}s, held {hold_seconds:.0f}s")
+    print(f"  rejected={stats['rejected']} errors={stats['errors']} closed_by_server={stats['closed_by_server']}")
+    if pid:
+        per_connection = (loaded - baseline) * 1024 / max(1, stats["connected"])
+        print(f"  server RSS {baseline:.1f}MB -> {loaded:.1f}MB ({per_connection:.1f}KB per connection)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--per-user", type=int, default=5, help="Streams per user; keep within the server's cap")
+    parser.add_argument("--hold-seconds", type=float, default=30)
+    parser.add_argument("--pid", type=int, default=0, help="Server process id, to report its RSS")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.connections, args.per_user, args.hold_seconds, args.pid))
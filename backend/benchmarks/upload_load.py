@@ -0,0 +1,81 @@
+"""
+Concurrent document uploads against a running server
+Uploads --uploads files of --size-mb from separate students at once, and reports upload latency, the
+latency of an unrelated endpoint while they are in flight and, with --pid, the server's peak RSS.
+Run from backend/: python -m benchmarks.upload_load --base-url http://localhost:8000 --uploads 20 --size-mb 20 --pid <uvicorn pid>
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+import httpx
+from benchmarks.common import percentile
+from benchmarks.login_load import probe
+from benchmarks.sse_connections import register_users, rss_mb
+
+
+async def sample_rss(pid: int, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        samples.append(rss_mb(pid))
+        await asyncio.sleep(0.05)
+
+
+async def upload(client: httpx.AsyncClient, token: str, payload: bytes, results: dict, latencies: list):
+    started = time.perf_counter()
+    response = await client.post(
+        "/api/documents/upload-file",
+        headers={"Authorization": f"Bearer {token}"},
+        data={"document_type": "academic_transcript"},
+        files={"file": (f"scan-{uuid.uuid4().hex[:6]}.pdf", payload, "application/pdf")}
+    )
+    latencies.append(time.perf_counter() - started)
+    results[response.status_code] = results.get(response.status_code, 0) + 1
+
+
+async def main(base_url: str, uploads: int, size_mb: float, probe_path: str, pid: int):
+    payload = os.urandom(int(size_mb * 1024 * 1024))
+    limits = httpx.Limits(max_connections=uploads + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        tokens = await register_users(client, uploads)
+
+        idle_samples = []
+        stop = asyncio.Event()
+        idle_probe = asyncio.create_task(probe(client, probe_path, stop, idle_samples))
+        await asyncio.sleep(2)
+        stop.set()
+        await idle_probe
+        rss_before = rss_mb(pid) if pid else None
+
+        loaded_samples, rss_samples, latencies, results = [], [], [], {}
+        stop = asyncio.Event()
+        background = [asyncio.create_task(probe(client, probe_path, stop, loaded_samples))]
+        if pid:
+            background.append(asyncio.create_task(sample_rss(pid, stop, rss_samples)))
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(client, token, payload, results, latencies) for token in tokens))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*background)
+
+    print(f"uploads: {uploads} x {size_mb:g} MB in {elapsed:.2f}s")
+    print(f"  status codes: {dict(sorted(results.items()))}")
+    print(f"  upload latency p50={percentile(latencies, 50):.2f}s p99={percentile(latencies, 99):.2f}s")
+    for label, samples in [("idle", idle_samples), ("during uploads", loaded_samples)]:
+        print(
+            f"{probe_path} {label}: n={len(samples)} "
+            f"p50={percentile(samples, 50) * 1000:.1f}ms p99={percentile(samples, 99) * 1000:.1f}ms"
+        )
+    if pid:
+        print(f"server RSS: {rss_before:.1f} MB before, {max(rss_samples, default=rss_before):.1f} MB peak")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=20)
+    parser.add_argument("--probe-path", default="/health")
+    parser.add_argument("--pid", type=int, default=0, help="server process id, to report its RSS")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.uploads, args.size_mb, args.probe_path, args.pid))
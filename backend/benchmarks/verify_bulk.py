@@ -0,0 +1,45 @@
+"""
+Benchmark document verification: PUT /{id}/verify per document vs PUT /verify-bulk
+Run from backend/: python -m benchmarks.verify_bulk [--students 2000] [--documents 500]
+"""
+import argparse
+import asyncio
+from app.models.document import DocumentVerifyBulk
+from app.routes.documents import verify_document, verify_documents_bulk
+from benchmarks.common import bench_database, seed_students, timed
+
+ADMIN = {"id": "bench-admin", "role": "admin"}
+
+
+async def unverified_ids(db, count: int):
+    cursor = db.documents.find({"status": {"$ne": "verified"}}, {"_id": 1}).limit(count)
+    return [str(doc["_id"]) async for doc in cursor]
+
+
+async def per_call(document_ids):
+    for document_id in document_ids:
+        await verify_document(document_id, current_admin=ADMIN)
+
+
+async def main(students: int, documents: int):
+    async with bench_database() as db:
+        await seed_students(db, students)
+
+        single_ids = await unverified_ids(db, documents)
+        _, per_call_time = await timed(per_call(single_ids))
+
+        bulk_ids = await unverified_ids(db, documents)
+        response, bulk_time = await timed(
+            verify_documents_bulk(DocumentVerifyBulk(document_ids=bulk_ids), current_admin=ADMIN)
+        )
+
+    print(f"per-call: {len(single_ids)} documents in {per_call_time:.2f}s ({len(single_ids) / per_call_time:,.0f}/s)")
+    print(f"bulk:     {response['verified']} documents in {bulk_time:.2f}s ({response['verified'] / bulk_time:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--documents", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.documents))
@@ -0,0 +1,50 @@
+"""
+Maintain the content-addressed upload store (uploads/blobs)
+Run from backend/:
+    python -m scripts.blobs migrate [--delete-originals]   # move uploads/<user_id>/ files into the store
+    python -m scripts.blobs gc [--dry-run]                 # delete blobs no document references
+    python -m scripts.blobs recount                        # rebuild refcounts from the documents collection
+"""
+import argparse
+import asyncio
+import sys
+from app.database.mongo import init_db, close_db
+from app.services.blob_store import collect_garbage, migrate_legacy_uploads, recount_blobs, BLOB_GC_GRACE_SECONDS
+
+
+async def main(args) -> int:
+    await init_db()
+    try:
+        if args.command == "migrate":
+            report = await migrate_legacy_uploads(delete_originals=args.delete_originals)
+            print(
+                f"Migrated {report['migrated']} document(s), {report['missing']} file(s) missing, "
+                f"{report['originals_deleted']} original(s) deleted"
+            )
+            return 1 if report["missing"] else 0
+
+        if args.command == "recount":
+            changed = await recount_blobs()
+            print(f"Corrected {changed} blob refcount(s)")
+            return 0
+
+        report = await collect_garbage(grace_seconds=args.grace_seconds, dry_run=args.dry_run)
+        action = "Would delete" if args.dry_run else "Deleted"
+        print(
+            f"Scanned {report['scanned']} blob(s). {action} {report['deleted']} "
+            f"({report['bytes_freed'] / (1024 * 1024):.1f} MB); "
+            f"removed {report['incoming_removed']} abandoned staging file(s)"
+        )
+        return 0
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["migrate", "gc", "recount"])
+    parser.add_argument("--delete-originals", action="store_true", help="migrate: remove the old per-user files")
+    parser.add_argument("--dry-run", action="store_true", help="gc: only report what would be deleted")
+    parser.add_argument("--grace-seconds", type=int, default=BLOB_GC_GRACE_SECONDS)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
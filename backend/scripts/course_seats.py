@@ -0,0 +1,27 @@
+"""
+Maintain course seat counters
+Run from backend/:
+    python -m scripts.course_seats recount   # reset registered_count from student_courses
+"""
+import argparse
+import asyncio
+import sys
+from app.database.mongo import init_db, close_db
+from app.services.course_seats import recount_seats
+
+
+async def main(command: str) -> int:
+    await init_db()
+    try:
+        changed = await recount_seats()
+        print(f"Corrected seat counts on {changed} course(s)")
+        return 0
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["recount"])
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.command)))
@@ -0,0 +1,34 @@
+"""
+Maintain the fee_transactions ledger
+Run from backend/:
+    python -m scripts.fee_ledger migrate   # move fees.transactions arrays into fee_transactions
+    python -m scripts.fee_ledger repair    # record recent payments that never reached the ledger
+"""
+import argparse
+import asyncio
+import sys
+from app.database.mongo import init_db, close_db
+from app.services.fee_service import migrate_embedded_transactions, repair_ledger
+
+
+async def main(command: str, batch_size: int) -> int:
+    await init_db()
+    try:
+        if command == "migrate":
+            report = await migrate_embedded_transactions(batch_size)
+            print(f"Moved {report['transactions']} transaction(s) from {report['fees']} fee record(s)")
+            return 0
+
+        recorded = await repair_ledger()
+        print(f"Recorded {recorded} missing transaction(s)")
+        return 0
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["migrate", "repair"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.command, args.batch_size)))
@@ -0,0 +1,35 @@
+"""
+Maintain room-level hostel inventory
+Run from backend/:
+    python -m scripts.hostel_rooms seed    # create rooms for hostels that have none (also done at startup)
+    python -m scripts.hostel_rooms place   # give allocated students from before room tracking a bed
+"""
+import argparse
+import asyncio
+import sys
+from app.database.mongo import init_db, close_db
+from app.services.hostel_rooms import place_allocated_students, seed_rooms
+
+
+async def main(command: str) -> int:
+    await init_db()
+    try:
+        if command == "seed":
+            created = await seed_rooms()
+            for hostel, rooms in created.items():
+                print(f"{hostel}: created {rooms} room(s)")
+            print(f"Seeded rooms for {len(created)} hostel(s)")
+            return 0
+
+        report = await place_allocated_students()
+        print(f"Placed {report['placed']} student(s); {report['no_free_bed']} had no free bed in their hostel")
+        return 1 if report["no_free_bed"] else 0
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["seed", "place"])
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.command)))
@@ -0,0 +1,36 @@
+"""
+Maintain the onboarding_state snapshots
+Run from backend/:
+    python -m scripts.onboarding_state rebuild   # recompute every student's snapshot
+    python -m scripts.onboarding_state check     # report snapshots that differ from a recompute
+"""
+import argparse
+import asyncio
+import sys
+from app.database.mongo import init_db, close_db
+from app.services.onboarding_service import rebuild_onboarding_states, check_onboarding_states
+
+
+async def main(command: str, batch_size: int) -> int:
+    await init_db()
+    try:
+        if command == "rebuild":
+            written = await rebuild_onboarding_states(batch_size)
+            print(f"Rebuilt {written} onboarding snapshots")
+            return 0
+
+        mismatches = await check_onboarding_states(batch_size)
+        for mismatch in mismatches:
+            print(f"{mismatch['user_id']}: {', '.join(mismatch['fields'])}")
+        print(f"{len(mismatches)} snapshot(s) out of date")
+        return 1 if mismatches else 0
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.command, args.batch_size)))
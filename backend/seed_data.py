@@ -68,31 +68,32 @@ async def seed_data():
         {
             "name": "North Hostel",
             "capacity": 200,
-            "available_rooms": 150,
+            "beds_per_room": 2,
             "created_at": datetime.utcnow()
         },
         {
             "name": "South Hostel",
             "capacity": 180,
-            "available_rooms": 120,
+            "beds_per_room": 2,
             "created_at": datetime.utcnow()
         },
         {
             "name": "East Hostel",
             "capacity": 150,
-            "available_rooms": 100,
+            "beds_per_room": 2,
             "created_at": datetime.utcnow()
         },
         {
             "name": "West Hostel",
             "capacity": 160,
-            "available_rooms": 110,
+            "beds_per_room": 2,
             "created_at": datetime.utcnow()
         },
     ]
     
-    # Clear existing hostels (optional)
+    # Clear existing hostels (optional); the server recreates their rooms on its next start
     await db.hostels.delete_many({})
+    await db.hostel_rooms.delete_many({})
     
     # Insert hostels
     result = await db.hostels.insert_many(hostels)
@@ -16,8 +16,19 @@ function Navbar() {
 
   useEffect(() => {
     fetchUnreadCount()
-    const interval = setInterval(fetchUnreadCount, 30000)
-    return () => clearInterval(interval)
+    const token = localStorage.getItem('token')
+    if (!token || typeof EventSource === 'undefined') {
+      const interval = setInterval(fetchUnreadCount, 30000)
+      return () => clearInterval(interval)
+    }
+    // The server pushes unread-count changes; EventSource reconnects on its own
+    const source = new EventSource(
+      `${api.defaults.baseURL}/notifications/stream?token=${encodeURIComponent(token)}`
+    )
+    source.addEventListener('unread_count', (event) => {
+      setUnreadCount(JSON.parse(event.data).count)
+    })
+    return () => source.close()
   }, [])
 
   const fetchUnreadCount = async () => {
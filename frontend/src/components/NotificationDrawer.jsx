@@ -7,6 +7,7 @@ import {
   Box,
   IconButton,
   Chip,
+  Button,
 } from '@mui/material'
 import CloseIcon from '@mui/icons-material/Close'
 import { useState, useEffect } from 'react'
@@ -14,6 +15,7 @@ import api from '../services/api'
 
 function NotificationDrawer({ open, onClose, onRead }) {
   const [notifications, setNotifications] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
 
   useEffect(() => {
     if (open) {
@@ -21,10 +23,13 @@ function NotificationDrawer({ open, onClose, onRead }) {
     }
   }, [open])
 
-  const fetchNotifications = async () => {
+  const fetchNotifications = async (cursor = null) => {
     try {
-      const response = await api.get('/notifications/')
-      setNotifications(response.data.notifications)
+      const response = await api.get('/notifications/', { params: cursor ? { cursor } : {} })
+      setNotifications((current) =>
+        cursor ? [...current, ...response.data.notifications] : response.data.notifications
+      )
+      setNextCursor(response.data.next_cursor)
     } catch (error) {
       console.error('Failed to fetch notifications:', error)
     }
@@ -99,6 +104,11 @@ function NotificationDrawer({ open, onClose, onRead }) {
             ))
           )}
         </List>
+        {nextCursor && (
+          <Button fullWidth onClick={() => fetchNotifications(nextCursor)}>
+            Load more
+          </Button>
+        )}
       </Box>
     </Drawer>
   )
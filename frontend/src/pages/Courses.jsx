@@ -60,7 +60,11 @@ function Courses() {
 
   const handleRegister = async () => {
     try {
-      await api.post('/courses/register', { course_ids: selectedCourses })
+      const response = await api.post('/courses/register', { course_ids: selectedCourses })
+      const waitlisted = (response.data.results || []).filter((result) => result.status === 'waitlisted')
+      if (waitlisted.length > 0) {
+        alert(`${waitlisted.length} course(s) are full; you have been added to the waitlist and will be registered when a seat opens.`)
+      }
       setSelectedCourses([])
       fetchMyCourses()
       fetchCourses()
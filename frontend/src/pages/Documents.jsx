@@ -125,7 +125,12 @@ function Documents() {
   const getFileUrl = (doc) => {
     const url = doc.file_url
     if (!url) return null
-    return url.startsWith('/') ? url : `/${url}`
+    if (url.startsWith('/api/')) {
+      // Stored files are served by the API, which needs the token on a plain link
+      const token = localStorage.getItem('token')
+      return `${api.defaults.baseURL}${url.slice('/api'.length)}?token=${encodeURIComponent(token || '')}`
+    }
+    return url.startsWith('/') || /^https?:\/\//.test(url) ? url : `/${url}`
   }
 
   if (loading) {
@@ -46,6 +46,7 @@ const DEFAULT_FEE = {
 function Fees() {
   const [fee, setFee] = useState(DEFAULT_FEE)
   const [transactions, setTransactions] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [paymentDialogOpen, setPaymentDialogOpen] = useState(false)
@@ -71,10 +72,12 @@ function Fees() {
     }
   }
 
-  const fetchTransactions = async () => {
+  const fetchTransactions = async (cursor = null) => {
     try {
-      const response = await api.get('/fees/transactions')
-      setTransactions(response.data.transactions || [])
+      const response = await api.get('/fees/transactions', { params: cursor ? { cursor } : {} })
+      const page = response.data.transactions || []
+      setTransactions((current) => (cursor ? [...current, ...page] : page))
+      setNextCursor(response.data.next_cursor)
     } catch (error) {
       console.error('Failed to fetch transactions:', error)
     }
@@ -266,6 +269,11 @@ function Fees() {
                   </TableBody>
                 </Table>
               </TableContainer>
+              {nextCursor && (
+                <Button fullWidth sx={{ mt: 1 }} onClick={() => fetchTransactions(nextCursor)}>
+                  Load more
+                </Button>
+              )}
             </CardContent>
           </Card>
         </Grid>
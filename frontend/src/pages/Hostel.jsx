@@ -334,7 +334,7 @@ function Hostel() {
                     Capacity: {hostel.capacity}
                   </Typography>
                   <Typography variant="body2" color="text.secondary">
-                    Available: {hostel.available_rooms} rooms
+                    Available: {hostel.free_beds} beds in {hostel.available_rooms} rooms
                   </Typography>
                 </CardContent>
               </Card>